@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from flask import current_app, request, make_response
+from flask_login import current_user
+
+
+class AdmissionRejected(Exception):
+    """Запрос отклонен контролем нагрузки"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class FeatureLimiter:
+    """Ограничение параллельных запросов одной функции с очередью ожидания"""
+
+    def __init__(self, name: str, concurrency: int, queue: int, per_user: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.per_user = per_user
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._per_user = defaultdict(int)
+        self.admitted = 0
+        self.rejected = defaultdict(int)
+
+    def acquire(self, user_id):
+        """Занять слот или выбросить AdmissionRejected"""
+        with self._cond:
+            if self.per_user and self._per_user[user_id] >= self.per_user:
+                self.rejected['user_limit'] += 1
+                raise AdmissionRejected('user_limit')
+
+            # Запрос учитывается в лимите пользователя уже в очереди, иначе
+            # несколько запросов одного пользователя прошли бы проверку до допуска
+            self._per_user[user_id] += 1
+            if self._in_flight >= self.concurrency or self._waiting:
+                if self._waiting >= self.queue:
+                    self._forget_user(user_id)
+                    self.rejected['queue_full'] += 1
+                    raise AdmissionRejected('queue_full')
+                self._waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._in_flight < self.concurrency, self.timeout)
+                finally:
+                    self._waiting -= 1
+                if not admitted:
+                    self._forget_user(user_id)
+                    self.rejected['timeout'] += 1
+                    raise AdmissionRejected('timeout')
+
+            self._in_flight += 1
+            self.admitted += 1
+
+    def release(self, user_id):
+        """Освободить слот"""
+        with self._cond:
+            self._in_flight -= 1
+            self._forget_user(user_id)
+            self._cond.notify()
+
+    def _forget_user(self, user_id):
+        self._per_user[user_id] -= 1
+        if not self._per_user[user_id]:
+            del self._per_user[user_id]
+
+    def stats(self) -> dict:
+        """Текущая загрузка и счетчики отказов"""
+        with self._cond:
+            return {
+                'concurrency': self.concurrency,
+                'queue_limit': self.queue,
+                'in_flight': self._in_flight,
+                'queue_depth': self._waiting,
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+            }
+
+
+def init_admission(app):
+    """Создать ограничители для функций из ADMISSION_LIMITS"""
+    app.extensions['admission'] = {
+        name: FeatureLimiter(
+            name,
+            concurrency=limits['concurrency'],
+            queue=limits['queue'],
+            per_user=app.config['ADMISSION_PER_USER_LIMIT'],
+            timeout=app.config['ADMISSION_QUEUE_TIMEOUT'],
+        )
+        for name, limits in app.config['ADMISSION_LIMITS'].items()
+    }
+
+
+def admission_stats(app) -> dict:
+    """Статистика всех ограничителей (для метрик)"""
+    return {name: limiter.stats() for name, limiter in app.extensions.get('admission', {}).items()}
+
+
+def _rejected_response(reason: str):
+    if reason == 'user_limit':
+        message = 'У вас уже выполняется запрос, дождитесь его завершения'
+    else:
+        message = 'Сервис перегружен, повторите попытку позже'
+    response = make_response(message, 503)
+    response.headers['Retry-After'] = str(current_app.config['ADMISSION_RETRY_AFTER'])
+    return response
+
+
+def acquire_slot(feature: str):
+    """
+    Занять слот функции до явного освобождения
+
+    Для потоковых ответов, где работа продолжается после выхода из маршрута.
+
+    Returns:
+        tuple: (функция освобождения слота, None) или (None, ответ 503)
+    """
+    limiter = current_app.extensions.get('admission', {}).get(feature)
+    if limiter is None:
+        return (lambda: None), None
+    user_id = current_user.get_id()
+    try:
+        limiter.acquire(user_id)
+    except AdmissionRejected as e:
+        return None, _rejected_response(e.reason)
+    return (lambda: limiter.release(user_id)), None
+
+
+def limit_concurrency(feature: str):
+    """
+    Декоратор маршрута: POST-запросы сверх лимита получают 503 с Retry-After
+
+    Применяется после login_required, лимиты действуют в пределах процесса-воркера.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'POST':
+                return view(*args, **kwargs)
+            release, rejected = acquire_slot(feature)
+            if rejected is not None:
+                return rejected
+            try:
+                return view(*args, **kwargs)
+            finally:
+                release()
+        return wrapper
+    return decorator
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+
+
+class AsyncRunner:
+    """Долгоживущий event loop в отдельном потоке для корутин из синхронных маршрутов"""
+
+    def __init__(self, executor_workers: int, timeout: float):
+        self.executor_workers = executor_workers
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        # Общий пул для блокирующих вызовов (yt-dlp и т.п.), переиспользуется между запросами
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.executor_workers,
+                                                     thread_name_prefix='async-executor'))
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='async-runner', daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop (запускается при первом обращении)"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    self._start()
+        return self._loop
+
+    def submit(self, coro):
+        """Запустить корутину в общем loop, не дожидаясь результата (concurrent.futures.Future)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float | None = None):
+        """Выполнить корутину в общем loop и дождаться результата"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout or self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise Exception('Превышено время ожидания операции')
+
+
+def init_runner(app):
+    """Один loop на приложение в процессе-воркере (поток стартует при первой корутине)"""
+    app.extensions['async_runner'] = AsyncRunner(
+        executor_workers=app.config['ASYNC_EXECUTOR_WORKERS'],
+        timeout=app.config['ASYNC_TASK_TIMEOUT'],
+    )
+
+
+def get_runner() -> AsyncRunner:
+    """Общий event loop текущего приложения"""
+    return current_app.extensions['async_runner']
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный тест: конкурентные TTS-запросы на один воркер
+
+Сравнивает прежнюю схему (asyncio.run на каждый запрос) с общим event loop
+из async_runner. Запросы выполняются из пула потоков, как в threaded WSGI-сервере.
+
+По умолчанию синтез имитируется (сетевая задержка + вызов в executor),
+с флагом --real используется edge-tts (нужен доступ к сети).
+
+Запуск:
+    python benchmarks/bench_async_tts.py --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_runner import AsyncRunner  # noqa: E402
+
+
+async def fake_synthesis(latency):
+    """Имитация edge-tts: ожидание сети и запись файла в executor"""
+    await asyncio.sleep(latency)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, bytes, 64 * 1024)
+
+
+async def real_synthesis(output_dir):
+    import edge_tts
+    fd, path = tempfile.mkstemp(suffix='.mp3', dir=output_dir)
+    os.close(fd)
+    await edge_tts.Communicate('Hello from the benchmark.', 'en-US-AriaNeural').save(path)
+
+
+def run_load(submit, make_coro, concurrency, requests):
+    """Запросов в секунду при заданной конкурентности"""
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        start = time.perf_counter()
+        list(clients.map(lambda _: submit(make_coro()), range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='имитация сетевой задержки, с')
+    parser.add_argument('--real', action='store_true', help='использовать edge-tts')
+    args = parser.parse_args()
+
+    output_dir = tempfile.mkdtemp(prefix='bench_tts_')
+    if args.real:
+        def make_coro():
+            return real_synthesis(output_dir)
+    else:
+        def make_coro():
+            return fake_synthesis(args.latency)
+
+    runner = AsyncRunner(executor_workers=8, timeout=120)
+    modes = [
+        ('asyncio.run на запрос', asyncio.run),
+        ('общий loop (runner)', runner.run),
+    ]
+
+    print(f"{'режим':<24}{'конкурентность':>16}{'запросов/с':>12}")
+    for concurrency in args.concurrency:
+        for name, submit in modes:
+            rate = run_load(submit, make_coro, concurrency, args.requests)
+            print(f'{name:<24}{concurrency:>16}{rate:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
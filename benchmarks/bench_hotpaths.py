@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарки функций на пути запроса с отчетом tracemalloc
+
+Для каждой функции сравниваются текущая реализация и прежняя (эталон ниже):
+результат должен совпадать, ускорение относительно эталона - не меньше
+min_speedup, пиковая временная память одного вызова - не больше max_peak_kb.
+При нарушении бюджета скрипт завершается с кодом 1, поэтому годится как
+проверка в CI; --json сохраняет результаты для отслеживания между сборками.
+
+Запуск:
+    python benchmarks/bench_hotpaths.py
+    python benchmarks/bench_hotpaths.py --json hotpaths.json --trace
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, current_app  # noqa: E402
+
+from helpers import clean_text_for_tts, calculate_tokens_needed  # noqa: E402
+from subtitles import compact_segments, assemble_text  # noqa: E402
+from video_downloader import VideoDownloader, TIKTOK_PATTERN, YOUTUBE_PATTERN, REELS_PATTERN  # noqa: E402
+
+# Бюджеты: минимальное ускорение относительно эталона и пик памяти одного вызова
+# Время зависит от машины, поэтому оно сравнивается с эталоном в том же запуске
+BUDGETS = {
+    'clean_text_for_tts': {'min_speedup': 1.4, 'max_peak_kb': 96},
+    'calculate_tokens_needed': {'min_speedup': 1.3, 'max_peak_kb': 4},
+    'assemble_segments': {'min_speedup': 1.2, 'max_peak_kb': 256},
+    'detect_platform': {'min_speedup': 1.3, 'max_peak_kb': 4},
+}
+
+
+# ====== Эталон: реализации до оптимизации ======
+
+def reference_clean_text(text):
+    text = re.sub(r'\s+\.\s+', '. ', text)
+    text = re.sub(r'\.{3,}', '...', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\.+$', '.', text.strip())
+    return text.strip()
+
+
+def reference_tokens(text_length):
+    return (text_length + current_app.config['CHARS_PER_TOKEN'] - 1) // current_app.config['CHARS_PER_TOKEN']
+
+
+def reference_assemble(result):
+    text = result.get('text', '').strip()
+    if 'segments' in result and result['segments']:
+        segments_text = ' '.join([seg.get('text', '').strip() for seg in result['segments'] if seg.get('text')])
+        if len(segments_text) > len(text):
+            text = segments_text.strip()
+    return ' '.join(text.split())
+
+
+def reference_detect_platform(url):
+    if re.search(TIKTOK_PATTERN, url):
+        return "TikTok"
+    if re.search(YOUTUBE_PATTERN, url):
+        return "YouTube"
+    if re.search(REELS_PATTERN, url):
+        return "Reels"
+    return None
+
+
+# ====== Входные данные ======
+
+def make_text(length=5000, seed=1):
+    """Текст с лишними пробелами, переносами и многоточиями, как из буфера обмена"""
+    rng = random.Random(seed)
+    words = ['Добро', 'пожаловать', 'в', 'службу', 'поддержки', 'нажмите', 'один', 'For', 'English', 'press']
+    separators = [' ', ' ', ' ', '  ', '\n', ' . ', '.... ', '\t', ', ']
+    parts = []
+    size = 0
+    while size < length:
+        part = rng.choice(words) + rng.choice(separators)
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)[:length - 3] + '...'
+
+
+def make_whisper_result(count=400, seed=2):
+    """Результат Whisper: сегменты с ведущим пробелом, общий текст - их конкатенация"""
+    rng = random.Random(seed)
+    segments = []
+    position = 0.0
+    for number in range(count):
+        words = ' '.join(rng.choice(['привет', 'мир', 'это', 'тест', 'сегмента']) for _ in range(rng.randint(3, 12)))
+        duration = rng.uniform(1.0, 6.0)
+        segments.append({'id': number, 'seek': 0, 'start': position, 'end': position + duration,
+                         'text': f' {words.capitalize()}.', 'tokens': list(range(20)), 'temperature': 0.0,
+                         'avg_logprob': -0.2, 'compression_ratio': 1.3, 'no_speech_prob': 0.01})
+        position += duration
+    return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments, 'language': 'ru'}
+
+
+URLS = [
+    'https://www.tiktok.com/@user/video/7234567890123456789',
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://www.instagram.com/reel/Cabc123XYZ/',
+    'https://example.com/some/other/video.mp4',
+]
+
+
+def build_cases():
+    """(имя, текущая реализация, эталон) - функции без аргументов"""
+    app = Flask(__name__)
+    app.config['CHARS_PER_TOKEN'] = 10
+    context = app.app_context()
+    context.push()
+
+    text = make_text()
+    result = make_whisper_result()
+    lengths = list(range(0, 5001, 50))
+
+    return [
+        ('clean_text_for_tts', lambda: clean_text_for_tts(text), lambda: reference_clean_text(text)),
+        ('calculate_tokens_needed',
+         lambda: [calculate_tokens_needed(length) for length in lengths],
+         lambda: [reference_tokens(length) for length in lengths]),
+        # Сборка текста и сегментов в Transcriber.transcribe
+        ('assemble_segments',
+         lambda: assemble_text(result['text'], compact_segments(result['segments'])),
+         lambda: (reference_assemble(result), compact_segments(result['segments']))[0]),
+        ('detect_platform',
+         lambda: [VideoDownloader.detect_platform(url) for url in URLS],
+         lambda: [reference_detect_platform(url) for url in URLS]),
+    ]
+
+
+# ====== Замеры ======
+
+def time_per_call(func, repeat):
+    """Лучшее время одного вызова, мкс"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def peak_per_call(func):
+    """Пиковая временная память одного вызова (tracemalloc), КБ"""
+    func()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - baseline) / 1024
+
+
+def print_top_allocations(name, func, limit=5):
+    """Строки кода с наибольшим объемом выделений (живых на момент снимка)"""
+    tracemalloc.start(10)
+    try:
+        results = [func() for _ in range(20)]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del results
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    print(f'  {name}:')
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        print(f'    {stat.size / 1024:8.1f} КБ {stat.count:6d} блоков  {os.path.basename(frame.filename)}:{frame.lineno}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='сохранить результаты в файл')
+    parser.add_argument('--trace', action='store_true', help='показать строки с наибольшими выделениями')
+    parser.add_argument('--no-budget', action='store_true', help='только отчет, без проверки бюджетов')
+    args = parser.parse_args()
+
+    results = []
+    failures = []
+    mismatches = []
+    print(f"{'функция':<26}{'мкс':>10}{'эталон':>10}{'ускорение':>11}{'пик, КБ':>10}{'эталон':>10}")
+    for name, func, reference in build_cases():
+        if func() != reference():
+            mismatches.append(f'{name}: результат отличается от эталона')
+        entry = {
+            'name': name,
+            'us_per_call': time_per_call(func, args.repeat),
+            'reference_us_per_call': time_per_call(reference, args.repeat),
+            'peak_kb': peak_per_call(func),
+            'reference_peak_kb': peak_per_call(reference),
+        }
+        entry['speedup'] = entry['reference_us_per_call'] / entry['us_per_call']
+        results.append(entry)
+        print(f"{name:<26}{entry['us_per_call']:>10.1f}{entry['reference_us_per_call']:>10.1f}"
+              f"{entry['speedup']:>10.2f}x{entry['peak_kb']:>10.1f}{entry['reference_peak_kb']:>10.1f}")
+
+        budget = BUDGETS[name]
+        if entry['speedup'] < budget['min_speedup']:
+            failures.append(f"{name}: ускорение {entry['speedup']:.2f}x меньше {budget['min_speedup']}x")
+        if entry['peak_kb'] > budget['max_peak_kb']:
+            failures.append(f"{name}: пик {entry['peak_kb']:.1f} КБ больше {budget['max_peak_kb']} КБ")
+
+    if args.trace:
+        print('\nНаибольшие выделения памяти:')
+        for name, func, _ in build_cases():
+            print_top_allocations(name, func)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'budgets': BUDGETS, 'failures': mismatches + failures},
+                      f, ensure_ascii=False, indent=2)
+
+    if args.no_budget:
+        failures = []
+    if mismatches or failures:
+        print('\n❌ Проверка не пройдена:')
+        for failure in mismatches + failures:
+            print(f'  {failure}')
+        sys.exit(1)
+    print('\n✅ Все функции в пределах бюджета')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Проверка многоузлового режима на нескольких локальных процессах
+
+Поднимаются узлы приложения (отдельные процессы) с общей SQLite-базой,
+общим томом (STORAGE_BACKEND=shared) и очередью задач (ENABLE_JOB_QUEUE):
+узел node0 только принимает запросы, остальные еще и выполняют задачи.
+edge-tts направляется на локальный сервер (fake_edge_tts.py).
+
+1. Распределение: запросы /dashboard идут на случайные узлы, файлы из истории
+   скачиваются через другой узел.
+2. Отказ узла: во время долгого синтеза узел, взявший задачу, убивается;
+   после истечения аренды задачу должен довести до конца другой узел.
+
+Запуск:
+    python benchmarks/bench_multinode.py --workers 2 --requests 20
+Код возврата 1, если какая-то из проверок не прошла.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from fake_edge_tts import FakeEdgeTTSServer  # noqa: E402
+from bench_routes import BenchClient, SAMPLE_TEXT  # noqa: E402
+
+LEASE_SECONDS = 2
+HEARTBEAT_INTERVAL = 0.5
+
+
+def make_config(workdir, node_id, job_workers):
+    class NodeConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'nodes.db')}"
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+        WTF_CSRF_ENABLED = False
+        SECRET_KEY = 'bench-multinode'
+        ENABLE_TTS = True
+        STORAGE_BACKEND = 'shared'
+        SHARED_STORAGE_ROOT = os.path.join(workdir, 'shared')
+        ENABLE_JOB_QUEUE = True
+        NODE_ID = node_id
+        JOB_WORKERS = job_workers
+        JOB_LEASE_SECONDS = LEASE_SECONDS
+        JOB_HEARTBEAT_INTERVAL = HEARTBEAT_INTERVAL
+        JOB_POLL_INTERVAL = 0.05
+        ADMISSION_LIMITS = {name: {'concurrency': 1000, 'queue': 1000} for name in Config.ADMISSION_LIMITS}
+        ADMISSION_PER_USER_LIMIT = 0
+
+    return NodeConfig
+
+
+def serve_node(args):
+    """Процесс одного узла"""
+    from werkzeug.serving import make_server
+    import edge_tts.communicate
+    from app import create_app
+
+    edge_tts.communicate.WSS_URL = args.tts_url
+    app = create_app(make_config(args.workdir, args.node, args.job_workers))
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    make_server('127.0.0.1', args.port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_node(workdir, node_id, job_workers, tts_url):
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), '--node', node_id, '--port', str(port),
+        '--workdir', workdir, '--job-workers', str(job_workers), '--tts-url', tts_url,
+    ])
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            urllib.request.urlopen(base_url + '/login').read()
+            return process, base_url
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                raise RuntimeError(f'Узел {node_id} не запустился')
+            time.sleep(0.2)
+
+
+def prepare_database(workdir):
+    """Таблицы и тестовый пользователь (в родительском процессе, без воркеров)"""
+    from app import create_app, init_db
+    from models import db, User
+
+    app = create_app(make_config(workdir, 'setup', 0))
+    init_db(app)
+    with app.app_context():
+        user = User(email='multinode@example.com', tokens=10_000_000)
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def job_rows(app):
+    from models import Job
+    with app.app_context():
+        return [(job.id, job.status, job.lease_owner, job.attempts, job.result) for job in Job.query.order_by(Job.id)]
+
+
+def check(results, name, ok, detail=''):
+    results.append(ok)
+    print(f"{'✅' if ok else '❌'} {name}{': ' + detail if detail else ''}")
+
+
+def scenario_distribution(app, nodes, clients, total, results):
+    print(f'\n1. Распределение: {total} запросов на {len(nodes)} узла')
+
+    def post(index):
+        client = clients[index % len(clients)]
+        return client.post('/dashboard', {'text': SAMPLE_TEXT, 'voice': 'ru-RU-SvetlanaNeural'})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = [status for status, _, _ in pool.map(post, range(total))]
+    print(f'   {total} запросов за {time.perf_counter() - start:.1f} с')
+    check(results, 'все запросы успешны', statuses.count(200) == total, str(Counter(statuses)))
+
+    executed = Counter(owner for _, status, owner, _, _ in job_rows(app) if status == 'done')
+    print(f'   выполнено узлами: {dict(executed)}')
+    check(results, 'задачи выполняли только узлы с воркерами', 'node0' not in executed)
+
+    # Скачивание из истории через другой узел: файл должен лежать на общем томе
+    from models import Conversion
+    with app.app_context():
+        conversion_ids = [conversion.id for conversion in Conversion.query.all()]
+    downloaded = 0
+    for conversion_id in conversion_ids:
+        client = random.choice(clients)
+        with client.opener.open(f'{client.base_url}/history/{conversion_id}/download') as response:
+            if response.status == 200 and len(response.read()) > 0:
+                downloaded += 1
+    check(results, 'файлы из истории отдаются любым узлом', downloaded == len(conversion_ids),
+          f'{downloaded} из {len(conversion_ids)}')
+
+
+def scenario_failover(app, processes, clients, tts_server, results):
+    print('\n2. Отказ узла во время выполнения задачи')
+    # Синтез дольше нескольких аренд: без heartbeat задачу забрал бы другой узел
+    tts_server.first_byte_latency = LEASE_SECONDS * 2
+    known = {row[0] for row in job_rows(app)}
+
+    response = {}
+    request_thread = threading.Thread(target=lambda: response.update(status=clients[0].post(
+        '/dashboard', {'text': SAMPLE_TEXT, 'voice': 'ru-RU-SvetlanaNeural'})[0]))
+    request_thread.start()
+
+    owner = None
+    while owner is None:
+        for job_id, status, lease_owner, _, _ in job_rows(app):
+            if job_id not in known and status == 'running':
+                owner = lease_owner
+        time.sleep(0.05)
+    time.sleep(LEASE_SECONDS * 1.5)
+    rows = {row[0]: row for row in job_rows(app) if row[0] not in known}
+    check(results, 'heartbeat удерживает аренду дольше JOB_LEASE_SECONDS',
+          all(row[2] == owner and row[3] == 1 for row in rows.values()))
+
+    print(f'   задачу выполняет {owner}, останавливаем узел')
+    processes[owner].send_signal(signal.SIGKILL)
+    processes[owner].wait()
+    tts_server.first_byte_latency = 0.2
+
+    request_thread.join()
+    (_, status, new_owner, attempts, _), = [row for row in job_rows(app) if row[0] not in known]
+    check(results, 'запрос завершился успешно', response.get('status') == 200, str(response.get('status')))
+    check(results, 'задачу довел другой узел', status == 'done' and new_owner != owner,
+          f'{new_owner}, попыток: {attempts}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='узлов с воркерами очереди')
+    parser.add_argument('--requests', type=int, default=20)
+    # Параметры процесса-узла (запускается самим скриптом)
+    parser.add_argument('--node', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--job-workers', type=int, default=2, help=argparse.SUPPRESS)
+    parser.add_argument('--tts-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.node:
+        serve_node(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench_multinode_')
+    tts_server = FakeEdgeTTSServer(first_byte_latency=0.2).start()
+    app = prepare_database(workdir)
+
+    processes, clients = {}, []
+    try:
+        for number in range(args.workers + 1):
+            node_id = f'node{number}'
+            process, base_url = start_node(workdir, node_id, 0 if number == 0 else 2, tts_server.url)
+            processes[node_id] = process
+            client = BenchClient(base_url)
+            client.post('/login', {'email': 'multinode@example.com', 'password': 'bench-password'})
+            clients.append(client)
+        print('Узлы: ' + json.dumps({node: client.base_url for node, client in zip(processes, clients)}))
+
+        results = []
+        scenario_distribution(app, processes, clients, args.requests, results)
+        if args.workers >= 2:
+            # Запросы принимает node0, задачу выполняет один из узлов с воркерами
+            scenario_failover(app, processes, clients, tts_server, results)
+    finally:
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+                process.wait()
+        tts_server.stop()
+
+    print(f'\nПроверок пройдено: {sum(results)} из {len(results)}')
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк пропускной способности входа (проверок пароля в секунду)
+
+Запуск:
+    python benchmarks/bench_password_hash.py
+    python benchmarks/bench_password_hash.py --methods scrypt:16384:8:1 pbkdf2:sha256:260000 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from password_hasher import PasswordHasher  # noqa: E402
+
+DEFAULT_METHODS = [
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+
+
+def bench(method, workers, logins):
+    """Логинов в секунду при заданном методе и размере пула"""
+    hasher = PasswordHasher(method=method, max_workers=workers, max_pending=logins, timeout=60)
+    password_hash = generate_password_hash('correct horse', method=method)
+
+    # Клиентов больше, чем потоков хэширования, как при всплеске входов
+    with ThreadPoolExecutor(max_workers=workers * 4) as clients:
+        start = time.perf_counter()
+        results = list(clients.map(lambda _: hasher.verify(password_hash, 'correct horse'), range(logins)))
+        elapsed = time.perf_counter() - start
+
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument('--logins', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'метод':<26}{'потоков':>8}{'логинов/с':>12}")
+    for method in args.methods:
+        for workers in sorted(set(args.workers)):
+            rate = bench(method, workers, args.logins)
+            print(f'{method:<26}{workers:>8}{rate:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный бенчмарк /dashboard, /video и /transcribe без доступа к сети
+
+edge-tts направляется на локальный websocket-сервер (fake_edge_tts.py),
+yt-dlp скачивает файл с локального HTTP-сервера (media_fixture.py).
+Приложение запускается в threaded WSGI-сервере Werkzeug с временной БД,
+каждый клиент - отдельный пользователь со своей сессией.
+
+Запуск:
+    python benchmarks/bench_routes.py --route dashboard --concurrency 1 8 32
+    python benchmarks/bench_routes.py --route video --concurrency 1 4 --requests 20
+    python benchmarks/bench_routes.py --route transcribe --media speech.mp3 --concurrency 1 2
+
+Нужны зависимости приложения (edge-tts/aiohttp, yt-dlp, whisper) и ffmpeg.
+"""
+import argparse
+import http.cookiejar
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from config import Config  # noqa: E402
+from fake_edge_tts import FakeEdgeTTSServer  # noqa: E402
+from media_fixture import MediaFixtureServer, make_sample_media  # noqa: E402
+
+SAMPLE_TEXT = ('Добро пожаловать в нашу службу поддержки. Для продолжения на русском языке нажмите один. '
+               'For English, press two. ')
+
+
+class BenchClient:
+    """HTTP-клиент с отдельной сессией (cookie) для одного пользователя"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def post(self, path, data=None, files=None):
+        """POST-запрос; возвращает (статус, заголовки, число байт тела)"""
+        if files:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for name, value in (data or {}).items():
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+            for name, (filename, content) in files.items():
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                             f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
+                             + content + b'\r\n')
+            parts.append(f'--{boundary}--\r\n'.encode())
+            body = b''.join(parts)
+            content_type = f'multipart/form-data; boundary={boundary}'
+        else:
+            body = urllib.parse.urlencode(data or {}).encode()
+            content_type = 'application/x-www-form-urlencoded'
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers={'Content-Type': content_type})
+        try:
+            with self.opener.open(request) as response:
+                return response.status, response.headers, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, len(e.read())
+
+
+def make_app(workdir, route, no_shedding):
+    """Приложение с временной БД и папками"""
+    from app import create_app, init_db
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        WTF_CSRF_ENABLED = False
+        AUDIO_FOLDER = os.path.join(workdir, 'audio')
+        VIDEO_FOLDER = os.path.join(workdir, 'video')
+        TRANSCRIBE_FOLDER = os.path.join(workdir, 'transcribe')
+        ENABLE_TTS = True
+        ENABLE_VIDEO_DOWNLOAD = True
+        ENABLE_TRANSCRIBE = route == 'transcribe'
+        VIDEO_ALLOW_GENERIC_URLS = True
+
+    if no_shedding:
+        BenchConfig.ADMISSION_LIMITS = {name: {'concurrency': 10_000, 'queue': 10_000}
+                                        for name in Config.ADMISSION_LIMITS}
+
+    app = create_app(BenchConfig)
+    init_db(app)
+    return app
+
+
+def create_clients(app, base_url, count):
+    """Пользователи с запасом токенов и вошедшие клиенты"""
+    from models import db, User
+
+    clients = []
+    with app.app_context():
+        for _ in range(count):
+            user = User(email=f'bench-{uuid.uuid4().hex[:12]}@example.com', tokens=10_000_000)
+            user.set_password('bench-password')
+            db.session.add(user)
+            clients.append(user.email)
+        db.session.commit()
+
+    result = []
+    for email in clients:
+        client = BenchClient(base_url)
+        client.post('/login', {'email': email, 'password': 'bench-password'})
+        result.append(client)
+    return result
+
+
+def make_request_func(route, fixture, mp3_path):
+    """Функция, выполняющая один запрос к маршруту"""
+    if route == 'dashboard':
+        return lambda client: client.post('/dashboard', {'text': SAMPLE_TEXT, 'voice': 'ru-RU-SvetlanaNeural'})
+    if route == 'video':
+        url = fixture.url('sample.mp4')
+        return lambda client: client.post('/video', {'url': url})
+    with open(mp3_path, 'rb') as f:
+        content = f.read()
+    filename = os.path.basename(mp3_path)
+    return lambda client: client.post('/transcribe', {'language': 'auto'}, files={'file': (filename, content)})
+
+
+def run_level(clients, request_func, total_requests):
+    """Прогон при конкурентности len(clients); возвращает латентности успешных и счетчики"""
+    latencies = []
+    counters = {'ok': 0, 'shed': 0, 'error': 0}
+    lock = threading.Lock()
+    remaining = [total_requests]
+
+    def worker(client):
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            status, headers, _ = request_func(client)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200 and 'attachment' in (headers.get('Content-Disposition') or ''):
+                    counters['ok'] += 1
+                    latencies.append(elapsed)
+                elif status == 503:
+                    counters['shed'] += 1
+                else:
+                    counters['error'] += 1
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, counters, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--route', choices=['dashboard', 'video', 'transcribe'], default='dashboard')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=50, help='запросов на каждый уровень конкурентности')
+    parser.add_argument('--tts-latency', type=float, default=0.2, help='задержка первого байта edge-tts, с')
+    parser.add_argument('--tts-chunk-latency', type=float, default=0.005, help='задержка между аудио-чанками, с')
+    parser.add_argument('--media', help='свой MP3/MP4 для /transcribe вместо синтетического тона')
+    parser.add_argument('--no-shedding', action='store_true', help='снять лимиты контроля нагрузки')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_routes_')
+    tts_server = FakeEdgeTTSServer(first_byte_latency=args.tts_latency, chunk_latency=args.tts_chunk_latency)
+    tts_server.start()
+    tts_server.patch_edge_tts()
+
+    media_dir = os.path.join(workdir, 'media')
+    mp3_path = args.media
+    if args.route != 'dashboard':
+        _, sample_mp3 = make_sample_media(media_dir)
+        mp3_path = mp3_path or sample_mp3
+    fixture = MediaFixtureServer(media_dir).start() if args.route == 'video' else None
+
+    app = make_app(workdir, args.route, args.no_shedding)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-wsgi', daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    request_func = make_request_func(args.route, fixture, mp3_path)
+    all_clients = create_clients(app, base_url, max(args.concurrency))
+
+    # Прогрев: загрузка моделей и ленивых импортов не должна попадать в замеры
+    request_func(all_clients[0])
+
+    print(f'Маршрут /{args.route}, {args.requests} запросов на уровень')
+    print(f"{'конкурентность':>15}{'ok':>6}{'503':>6}{'ошибок':>8}{'p50, мс':>10}{'p99, мс':>10}{'запросов/с':>12}")
+    for concurrency in args.concurrency:
+        latencies, counters, wall = run_level(all_clients[:concurrency], request_func, args.requests)
+        if latencies:
+            p50 = f'{percentile(latencies, 0.5) * 1000:.0f}'
+            p99 = f'{percentile(latencies, 0.99) * 1000:.0f}'
+        else:
+            p50 = p99 = '-'
+        print(f"{concurrency:>15}{counters['ok']:>6}{counters['shed']:>6}{counters['error']:>8}"
+              f"{p50:>10}{p99:>10}{counters['ok'] / wall:>12.1f}")
+
+    server.shutdown()
+    tts_server.stop()
+    if fixture:
+        fixture.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк холодного старта приложения
+
+Измеряет суммарное время импорта `app` (python -X importtime) и время
+от запуска интерпретатора до ответа на первый запрос. Завершается с кодом 1,
+если медиана превышает бюджет, поэтому годится как проверка в CI.
+
+Запуск:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 7 --import-budget-ms 800 --ttfr-budget-ms 1200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST_SCRIPT = '''
+import time
+start = time.perf_counter()
+from app import app
+response = app.test_client().get('/')
+assert response.status_code == 200, response.status_code
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def measure_importtime():
+    """Суммарное время импорта app и самые медленные модули (мс)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    total_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        # Модули верхнего уровня (без отступа) уже включают время вложенных импортов
+        if not line.rsplit('|', 1)[1].startswith('  '):
+            total_us += int(cumulative_us)
+        modules.append((int(self_us), name))
+    modules.sort(reverse=True)
+    return total_us / 1000, modules[:10]
+
+
+def measure_first_request():
+    """Время от старта интерпретатора до ответа на первый запрос (мс)"""
+    result = subprocess.run([sys.executable, '-c', FIRST_REQUEST_SCRIPT],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=1000)
+    parser.add_argument('--ttfr-budget-ms', type=float, default=1500)
+    args = parser.parse_args()
+
+    import_times = []
+    slowest = []
+    for _ in range(args.runs):
+        total, slowest = measure_importtime()
+        import_times.append(total)
+    first_request_times = [measure_first_request() for _ in range(args.runs)]
+
+    import_ms = statistics.median(import_times)
+    ttfr_ms = statistics.median(first_request_times)
+
+    print('Самые медленные модули (self, мс):')
+    for self_us, name in slowest:
+        print(f'  {self_us / 1000:8.1f}  {name}')
+    print(f'Импорт app:       {import_ms:8.1f} мс (бюджет {args.import_budget_ms:.0f})')
+    print(f'Первый запрос:    {ttfr_ms:8.1f} мс (бюджет {args.ttfr_budget_ms:.0f})')
+
+    failed = False
+    if import_ms > args.import_budget_ms:
+        print('❌ Превышен бюджет времени импорта')
+        failed = True
+    if ttfr_ms > args.ttfr_budget_ms:
+        print('❌ Превышен бюджет времени до первого запроса')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
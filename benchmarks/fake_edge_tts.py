@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Локальная замена сервиса edge-tts для бенчмарков без сети
+
+Websocket-сервер на aiohttp (зависимость edge-tts) повторяет протокол
+speech.platform.bing.com: turn.start, бинарные сообщения Path:audio с
+заготовленными MP3-кадрами и turn.end. Задержки настраиваются.
+
+    server = FakeEdgeTTSServer(first_byte_latency=0.2, chunk_latency=0.01)
+    server.start()
+    server.patch_edge_tts()   # edge_tts.Communicate будет ходить на локальный сервер
+"""
+import asyncio
+import threading
+import uuid
+
+from aiohttp import web, WSMsgType
+
+# MPEG-1 Layer III, 128 кбит/с, 44.1 кГц: заголовок + тишина, 417 байт на кадр (~26 мс звука)
+MP3_FRAME = bytes.fromhex('fffb9064') + bytes(413)
+
+
+def _text_message(request_id, path, body):
+    return (f'X-RequestId:{request_id}\r\n'
+            f'Content-Type:application/json; charset=utf-8\r\n'
+            f'Path:{path}\r\n\r\n{body}')
+
+
+def _audio_message(request_id, data):
+    header = (f'X-RequestId:{request_id}\r\n'
+              f'Content-Type:audio/mpeg\r\n'
+              f'X-StreamId:{uuid.uuid4().hex}\r\n'
+              f'Path:audio\r\n').encode()
+    return len(header).to_bytes(2, 'big') + header + data
+
+
+class FakeEdgeTTSServer:
+    """Websocket-сервер, отдающий заготовленное аудио с заданными задержками"""
+
+    def __init__(self, host='127.0.0.1', port=0, first_byte_latency=0.2, chunk_latency=0.005,
+                 frames_per_chunk=8, frames_per_100_chars=40):
+        self.host = host
+        self.port = port
+        self.first_byte_latency = first_byte_latency
+        self.chunk_latency = chunk_latency
+        self.frames_per_chunk = frames_per_chunk
+        self.frames_per_100_chars = frames_per_100_chars
+        self.sessions = 0
+        self._loop = None
+        self._runner = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f'ws://{self.host}:{self.port}/consumer/speech/synthesize/readaloud/edge/v1?TrustedClientToken=bench'
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sessions += 1
+        async for message in ws:
+            if message.type != WSMsgType.TEXT or 'Path:ssml' not in message.data:
+                continue
+            request_id = uuid.uuid4().hex
+            # Длина аудио пропорциональна длине SSML
+            ssml_length = len(message.data.split('\r\n\r\n', 1)[-1])
+            frames = max(1, ssml_length * self.frames_per_100_chars // 100)
+
+            try:
+                await ws.send_str(_text_message(request_id, 'turn.start', '{}'))
+                await asyncio.sleep(self.first_byte_latency)
+                for offset in range(0, frames, self.frames_per_chunk):
+                    count = min(self.frames_per_chunk, frames - offset)
+                    await ws.send_bytes(_audio_message(request_id, MP3_FRAME * count))
+                    if self.chunk_latency:
+                        await asyncio.sleep(self.chunk_latency)
+                await ws.send_str(_text_message(request_id, 'turn.end', '{}'))
+            except ConnectionResetError:
+                # Клиент отключился (например, процесс узла остановлен в бенчмарке)
+                break
+        return ws
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get('/consumer/speech/synthesize/readaloud/edge/v1', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    def start(self):
+        """Запуск сервера в фоновом потоке"""
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._serve())
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name='fake-edge-tts', daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def patch_edge_tts(self):
+        """Направить edge_tts.Communicate на локальный сервер"""
+        import edge_tts.communicate
+        edge_tts.communicate.WSS_URL = self.url
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Локальный HTTP-сервер с медиафайлами для бенчмарков без сети
+
+Прямые ссылки на .mp4 скачиваются generic-экстрактором yt-dlp, тот же файл
+годится для загрузки в /transcribe. Тестовые файлы создаются через ffmpeg.
+"""
+import functools
+import os
+import subprocess
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class MediaFixtureServer:
+    """Раздача файлов из папки по HTTP (с поддержкой докачки через yt-dlp)"""
+
+    def __init__(self, directory, host='127.0.0.1', port=0):
+        self.directory = directory
+        handler = functools.partial(_QuietHandler, directory=directory)
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self.host, self.port = self._server.server_address[:2]
+
+    def url(self, filename):
+        return f'http://{self.host}:{self.port}/{filename}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='media-fixture', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def make_sample_media(directory, duration=10):
+    """Создать sample.mp4 и sample.mp3 (тестовая картинка и тон) через ffmpeg"""
+    os.makedirs(directory, exist_ok=True)
+    mp4_path = os.path.join(directory, 'sample.mp4')
+    mp3_path = os.path.join(directory, 'sample.mp3')
+    if not os.path.exists(mp4_path):
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc=duration={duration}:size=320x240:rate=25',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', 'libx264', '-c:a', 'aac', '-shortest', mp4_path,
+        ], check=True)
+    if not os.path.exists(mp3_path):
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y', '-i', mp4_path, '-vn', '-c:a', 'libmp3lame', mp3_path,
+        ], check=True)
+    return mp4_path, mp3_path
@@ -6,8 +6,8 @@ class Config:
     # Секретный ключ для сессий (ИЗМЕНИТЕ ЭТО!)
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
 
-    # База данных SQLite
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///tts_website.db'
+    # База данных (SQLite по умолчанию; для нескольких узлов - общая, например PostgreSQL)
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///tts_website.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # Папка для аудиофайлов
@@ -19,6 +19,10 @@ class Config:
     # Папка для транскрибированных файлов
     TRANSCRIBE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcribe_files")
 
+    # Разрешить скачивание по любым ссылкам generic-экстрактором yt-dlp
+    # Только для бенчмарков и тестов с локальными файлами, в продакшене не включать
+    VIDEO_ALLOW_GENERIC_URLS = os.environ.get('VIDEO_ALLOW_GENERIC_URLS', 'false').lower() == 'true'
+
     # Максимальный размер файла для загрузки (100 МБ)
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024
 
@@ -28,13 +32,128 @@ class Config:
     # Стоимость в токенах (1 токен = 10 символов)
     CHARS_PER_TOKEN = 10
 
+    # Пакетная озвучка (POST /api/tts/batch): максимум фрагментов в запросе
+    # и одновременных запросов к edge-tts на один пакет
+    TTS_BATCH_MAX_ITEMS = int(os.environ.get('TTS_BATCH_MAX_ITEMS', '500'))
+    TTS_BATCH_CONCURRENCY = int(os.environ.get('TTS_BATCH_CONCURRENCY', '8'))
+
     # Админ по умолчанию (создается автоматически)
     DEFAULT_ADMIN_EMAIL = 'admin@example.com'
     DEFAULT_ADMIN_PASSWORD = 'admin123'  # ИЗМЕНИТЕ ПОСЛЕ ПЕРВОГО ВХОДА!
 
+    # ====== Отдача файлов ======
+    # Отдавать файлы через фронт-прокси (nginx X-Accel-Redirect) без копирования через Python
+    # Пример nginx:
+    #   location /protected/ { internal; alias /path/to/tts_website/; }
+    # Тогда audio_files/a.mp3 отдается как /protected/audio_files/a.mp3
+    X_ACCEL_REDIRECT = os.environ.get('X_ACCEL_REDIRECT', 'false').lower() == 'true'
+    X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/protected')
+
+    # Для Apache/lighttpd можно включить встроенный во Flask X-Sendfile
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+
+    # ====== Несколько узлов ======
+    # Хранилище файлов: 'local' - папки выше на этом узле, 'shared' - общий том всех узлов
+    # (NFS/EFS) в SHARED_STORAGE_ROOT с атомарной записью через временный файл и rename
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    SHARED_STORAGE_ROOT = os.environ.get('SHARED_STORAGE_ROOT')
+
+    # Общая очередь задач в БД: TTS, скачивание и транскрибацию выполняет любой свободный узел
+    # Нужна общая база (не файл SQLite на каждом узле) и STORAGE_BACKEND=shared
+    ENABLE_JOB_QUEUE = os.environ.get('ENABLE_JOB_QUEUE', 'false').lower() == 'true'
+
+    # Идентификатор узла в аренде задач (по умолчанию имя хоста и pid)
+    NODE_ID = os.environ.get('NODE_ID')
+
+    # Потоков-воркеров на узле (0 - узел только принимает запросы) и типы задач, которые он берет
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+    JOB_KINDS = [kind for kind in os.environ.get('JOB_KINDS', 'tts,video,transcribe').split(',') if kind]
+
+    # Аренда задачи, с: узел продлевает ее каждые JOB_HEARTBEAT_INTERVAL, пока работает;
+    # если узел упал, через JOB_LEASE_SECONDS задачу заберет другой (не более JOB_MAX_ATTEMPTS раз)
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+    JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', '15'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+
+    # Как часто опрашивать очередь и сколько маршрут ждет результата задачи, с
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '0.2'))
+    JOB_WAIT_TIMEOUT = float(os.environ.get('JOB_WAIT_TIMEOUT', '900'))
+
+    # ====== Статика ======
+    # Собранная статика (python static_assets.py): имена с хэшем содержимого и варианты .gz/.br
+    # Пока сборка не запускалась, шаблоны ссылаются на обычные файлы из static/
+    ASSETS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static_build")
+
+    # Время кэширования собранных файлов браузером, с (имя меняется вместе с содержимым)
+    ASSETS_MAX_AGE = int(os.environ.get('ASSETS_MAX_AGE', str(365 * 24 * 3600)))
+
+    # ====== Перекодирование аудио ======
+    # Потоков для ffmpeg (компактные форматы Opus/MP3 низкого битрейта) и таймаут, с
+    TRANSCODE_WORKERS = int(os.environ.get('TRANSCODE_WORKERS', '2'))
+    TRANSCODE_TIMEOUT = float(os.environ.get('TRANSCODE_TIMEOUT', '120'))
+
+    # ====== Контроль нагрузки ======
+    # Параллельных запросов на функцию и размер очереди ожидания (в пределах одного воркера)
+    # Запросы сверх очереди сразу получают 503 с заголовком Retry-After
+    ADMISSION_LIMITS = {
+        'tts': {
+            'concurrency': int(os.environ.get('TTS_MAX_CONCURRENT', '8')),
+            'queue': int(os.environ.get('TTS_MAX_QUEUE', '16')),
+        },
+        'video': {
+            'concurrency': int(os.environ.get('VIDEO_MAX_CONCURRENT', '2')),
+            'queue': int(os.environ.get('VIDEO_MAX_QUEUE', '4')),
+        },
+        'transcribe': {
+            'concurrency': int(os.environ.get('TRANSCRIBE_MAX_CONCURRENT', '1')),
+            'queue': int(os.environ.get('TRANSCRIBE_MAX_QUEUE', '2')),
+        },
+    }
+
+    # Одновременных запросов одного пользователя к одной функции (0 - без ограничения)
+    ADMISSION_PER_USER_LIMIT = int(os.environ.get('ADMISSION_PER_USER_LIMIT', '1'))
+
+    # Сколько секунд запрос ждет в очереди и что советовать клиенту в Retry-After
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', '30'))
+
+    # ====== Метрики ======
+    # Эндпоинт /metrics в формате Prometheus
+    ENABLE_METRICS = os.environ.get('ENABLE_METRICS', 'true').lower() == 'true'
+
+    # /metrics требует заголовок Authorization: Bearer <токен>; без токена доступен только в DEBUG
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # ====== Профилирование ======
+    # Админ может профилировать отдельный запрос: заголовок X-Profile: 1 или ?_profile=1
+    # Профили в свернутом формате (flamegraph.pl, speedscope) доступны в админ-панели
+    PROFILE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+    PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', '0.005'))  # Интервал семплирования, с
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))  # Сколько последних профилей хранить
+
+    # ====== Асинхронные операции ======
+    # Потоков в общем пуле для блокирующих вызовов (yt-dlp) внутри event loop
+    ASYNC_EXECUTOR_WORKERS = int(os.environ.get('ASYNC_EXECUTOR_WORKERS', '8'))
+
+    # Максимальное время ожидания синтеза речи или скачивания видео (секунды)
+    ASYNC_TASK_TIMEOUT = float(os.environ.get('ASYNC_TASK_TIMEOUT', '600'))
+
+    # ====== Хэширование паролей ======
+    # Метод и стоимость KDF в формате Werkzeug: 'scrypt:N:r:p' или 'pbkdf2:sha256:итерации'
+    # Пароли со старыми параметрами перехэшируются при следующем успешном входе
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+    # Размер пула потоков для хэширования и число ожидающих задач сверх него
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '16'))
+
+    # Сколько секунд ждать места в очереди, прежде чем отказать во входе
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '5'))
+
     # ====== Флаги включения/отключения функций ======
-    # Если функция отключена, модуль не загружается и маршрут не регистрируется
-    # Это снижает нагрузку на сервер и потребление памяти
+    # Если функция отключена, ее маршрут перенаправляет на главную страницу.
+    # Тяжелые модули (edge_tts, yt_dlp, whisper) загружаются только при первом
+    # обращении к разделу, поэтому отключенная функция не тратит память
     #
     # Примеры использования:
     # - Отключить транскрибацию: установите ENABLE_TRANSCRIBE = False
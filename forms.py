@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileRequired, FileAllowed
-from wtforms import StringField, PasswordField, TextAreaField, IntegerField, SelectField
+from wtforms import StringField, PasswordField, TextAreaField, IntegerField, SelectField, BooleanField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, URL
 from models import User
 
@@ -38,22 +38,31 @@ class LoginForm(FlaskForm):
     ])
 
 
+# Голоса edge-tts, доступные для озвучки (форма и пакетный API)
+VOICES = [
+    ('en-US-AriaNeural', '🇺🇸 Aria (US Female)'),
+    ('en-US-GuyNeural', '🇺🇸 Guy (US Male)'),
+    ('en-GB-SoniaNeural', '🇬🇧 Sonia (UK Female)'),
+    ('en-GB-RyanNeural', '🇬🇧 Ryan (UK Male)'),
+    ('ru-RU-SvetlanaNeural', '🇷🇺 Светлана (RU Female)'),
+    ('ru-RU-DmitryNeural', '🇷🇺 Дмитрий (RU Male)'),
+    ('uk-UA-PolinaNeural', '🇺🇦 Поліна (UA Female)'),
+    ('uk-UA-OstapNeural', '🇺🇦 Остап (UA Male)'),
+]
+
+
 class TTSForm(FlaskForm):
     """Форма конвертации текста в речь"""
     text = TextAreaField('Текст для озвучки', validators=[
         DataRequired(message='Введите текст'),
         Length(max=5000, message='Максимум 5000 символов')
     ])
-    voice = SelectField('Голос', choices=[
-        ('en-US-AriaNeural', '🇺🇸 Aria (US Female)'),
-        ('en-US-GuyNeural', '🇺🇸 Guy (US Male)'),
-        ('en-GB-SoniaNeural', '🇬🇧 Sonia (UK Female)'),
-        ('en-GB-RyanNeural', '🇬🇧 Ryan (UK Male)'),
-        ('ru-RU-SvetlanaNeural', '🇷🇺 Светлана (RU Female)'),
-        ('ru-RU-DmitryNeural', '🇷🇺 Дмитрий (RU Male)'),
-        ('uk-UA-PolinaNeural', '🇺🇦 Поліна (UA Female)'),
-        ('uk-UA-OstapNeural', '🇺🇦 Остап (UA Male)'),
-    ])
+    voice = SelectField('Голос', choices=VOICES)
+    output_format = SelectField('Формат', choices=[
+        ('mp3', 'MP3 (оригинал)'),
+        ('mp3_low', 'MP3 32 кбит/с (меньше размер)'),
+        ('opus', 'Opus/WebM (самый компактный)'),
+    ], default='mp3')
 
 
 class GrantTokensForm(FlaskForm):
@@ -68,6 +77,17 @@ class GrantTokensForm(FlaskForm):
     note = StringField('Примечание', validators=[Length(max=200)])
 
 
+class BulkGrantTokensForm(FlaskForm):
+    """Форма массовой выдачи токенов из CSV (для админа)"""
+    file = FileField(
+        'CSV-файл (email,tokens,note)',
+        validators=[
+            FileRequired(message='Выберите CSV-файл'),
+            FileAllowed(['csv'], message='Поддерживаются только файлы CSV')
+        ]
+    )
+
+
 class VideoDownloadForm(FlaskForm):
     """Форма скачивания видео"""
     url = StringField(
@@ -155,3 +175,10 @@ class TranscribeForm(FlaskForm):
         default='auto',
         validators=[DataRequired(message='Выберите язык')]
     )
+    output_format = SelectField('Формат результата', choices=[
+        ('txt', 'Текст (.txt)'),
+        ('srt', 'Субтитры SRT (.srt)'),
+        ('vtt', 'Субтитры WebVTT (.vtt)'),
+        ('json', 'JSON с временными метками (.json)'),
+    ], default='txt')
+    word_timestamps = BooleanField('Время каждого слова (в JSON, транскрибация дольше)')
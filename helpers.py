@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+
+from flask import current_app, send_from_directory, Response, abort, render_template, make_response, request
+from flask_login import current_user
+from markupsafe import Markup
+
+
+# Шаблоны очистки текста компилируются один раз при импорте
+_SPACED_DOT_RE = re.compile(r'\s+\.\s+')
+_LONG_ELLIPSIS_RE = re.compile(r'\.{4,}')
+
+
+def clean_text_for_tts(text):
+    """Очистка текста для озвучки"""
+    text = _SPACED_DOT_RE.sub('. ', text)
+    # Многоточие длиннее трех точек сокращается до трех
+    if '....' in text:
+        text = _LONG_ELLIPSIS_RE.sub('...', text)
+    # split() без аргументов делит по тем же пробельным символам, что и \s, и сразу обрезает края
+    text = ' '.join(text.split())
+    if text.endswith('..'):
+        text = text.rstrip('.') + '.'
+    return text
+
+
+def calculate_tokens_needed(text_length):
+    """Рассчитать необходимое количество токенов"""
+    chars_per_token = current_app.config['CHARS_PER_TOKEN']
+    return (text_length + chars_per_token - 1) // chars_per_token
+
+
+def send_stored_file(filepath, download_name, mimetype=None):
+    """
+    Отдача сохраненного файла с поддержкой Range и ETag/If-None-Match
+
+    При X_ACCEL_REDIRECT=true отдачу выполняет nginx (zero-copy, докачка на его стороне).
+    """
+    folder, filename = os.path.split(filepath)
+    if current_app.config.get('X_ACCEL_REDIRECT'):
+        if not os.path.isfile(filepath):
+            abort(404)
+        location = f"{current_app.config['X_ACCEL_PREFIX'].rstrip('/')}/{quote(os.path.basename(folder))}/{quote(filename)}"
+        response = Response(mimetype=mimetype or mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = location
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        return response
+    # conditional=True включает ответы 206/304 для Range и If-None-Match
+    return send_from_directory(folder, filename, as_attachment=True, download_name=download_name,
+                               mimetype=mimetype, conditional=True, etag=True)
+
+
+def render_fragment(template_name, key=(), **context):
+    """
+    Отрисовать фрагмент шаблона один раз и дальше отдавать из кэша процесса
+
+    key - значения, от которых зависит фрагмент (например, вошел ли пользователь).
+    В режиме отладки кэш отключен, чтобы правки шаблонов были видны сразу.
+    """
+    if current_app.debug:
+        return Markup(render_template(template_name, **context))
+    cache = current_app.extensions.setdefault('fragment_cache', {})
+    cache_key = (template_name, key)
+    html = cache.get(cache_key)
+    if html is None:
+        html = cache[cache_key] = Markup(render_template(template_name, **context))
+    return html
+
+
+def conditional_page(html):
+    """Страница с ETag по содержимому: неизменившаяся страница отдается как 304 без тела"""
+    response = make_response(html)
+    response.add_etag()
+    # Браузер хранит страницу, но каждый раз сверяет ETag; с данными пользователя - только в своем кэше
+    response.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    return response.make_conditional(request)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Общая очередь задач в базе данных для работы нескольких узлов за балансировщиком
+
+Маршрут ставит задачу в таблицу job и ждет результата. Любой узел с воркерами
+захватывает задачу условным UPDATE (аренда на JOB_LEASE_SECONDS) и продлевает
+аренду heartbeat'ом, пока задача выполняется. Если узел упал, аренда истекает и
+задачу забирает другой узел (не более JOB_MAX_ATTEMPTS попыток). Результаты
+лежат в общем хранилище (storage.py), поэтому их может отдать любой узел.
+
+Без ENABLE_JOB_QUEUE обработчики вызываются прямо в запросе, как раньше.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, and_, or_
+
+from models import db, Job
+
+# Обработчики задач по типу: payload (dict) -> результат (dict)
+HANDLERS = {}
+
+
+def job_handler(kind: str):
+    """Регистрация обработчика задач типа kind"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _expired(now):
+    return and_(Job.status == 'running', Job.lease_expires_at < now)
+
+
+def claim_job(node_id: str, kinds, lease_seconds: float, max_attempts: int):
+    """Захватить задачу в аренду; None, если подходящих задач нет"""
+    now = datetime.utcnow()
+
+    # Задачи, чьи узлы падали слишком много раз, больше не перезапускаются
+    db.session.execute(
+        update(Job)
+        .where(_expired(now), Job.attempts >= max_attempts)
+        .values(status='failed', error='Узел, выполнявший задачу, перестал отвечать', updated_at=now)
+    )
+
+    available = and_(Job.kind.in_(kinds), or_(Job.status == 'queued', _expired(now)))
+    candidates = db.session.scalars(select(Job.id).where(available).order_by(Job.id).limit(5)).all()
+    for job_id in candidates:
+        # Условный UPDATE: из нескольких узлов задачу получит только один
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, available)
+            .values(status='running', lease_owner=node_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    attempts=Job.attempts + 1, updated_at=now)
+        ).rowcount
+        if claimed:
+            db.session.commit()
+            return db.session.get(Job, job_id)
+    db.session.commit()
+    return None
+
+
+def extend_lease(job_id: int, node_id: str, lease_seconds: float) -> bool:
+    """Продлить аренду; False, если задача уже у другого узла"""
+    now = datetime.utcnow()
+    extended = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.lease_owner == node_id, Job.status == 'running')
+        .values(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+    ).rowcount
+    db.session.commit()
+    return bool(extended)
+
+
+def finish_job(job_id: int, node_id: str, result=None, error=None) -> bool:
+    """Сохранить результат, если аренда все еще у этого узла"""
+    finished = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.lease_owner == node_id, Job.status == 'running')
+        .values(status='failed' if error else 'done', result=result, error=error and error[:500],
+                lease_expires_at=None, updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return bool(finished)
+
+
+def run_job(kind: str, payload: dict, user_id=None) -> dict:
+    """
+    Выполнить задачу и вернуть ее результат
+
+    В многоузловом режиме задача ставится в общую очередь, и маршрут ждет,
+    пока ее выполнит любой узел. Ошибка обработчика выбрасывается как Exception.
+    """
+    config = current_app.config
+    if not config.get('ENABLE_JOB_QUEUE'):
+        return HANDLERS[kind](payload)
+
+    job = Job(kind=kind, user_id=user_id, payload=payload)
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+
+    worker = current_app.extensions.get('job_worker')
+    if worker is not None:
+        worker.wake()
+
+    deadline = time.monotonic() + config['JOB_WAIT_TIMEOUT']
+    while True:
+        row = db.session.execute(select(Job.status, Job.result, Job.error).where(Job.id == job_id)).one()
+        # Завершаем транзакцию, чтобы следующий опрос увидел изменения других узлов
+        db.session.commit()
+        if row.status == 'done':
+            return row.result
+        if row.status == 'failed':
+            raise Exception(row.error or 'Задача не выполнена')
+        if time.monotonic() > deadline:
+            raise Exception(f'Задача #{job_id} не выполнена за отведенное время')
+        time.sleep(config['JOB_POLL_INTERVAL'])
+
+
+class JobWorker:
+    """Потоки узла, захватывающие и выполняющие задачи из общей очереди"""
+
+    def __init__(self, app, kinds, threads: int):
+        self.app = app
+        self.kinds = list(kinds)
+        self.threads = threads
+        self.node_id = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        # Процесс, создавший приложение (с gunicorn --preload - мастер, который не выполняет задачи)
+        self._owner_pid = os.getpid()
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """
+        Запустить воркеры в текущем процессе, если они еще не запущены
+
+        Вызывается перед первым запросом процесса (или из post_fork gunicorn),
+        поэтому мастер с --preload задачи не захватывает, а каждый воркер после
+        fork запускает собственные потоки.
+        """
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._start_lock:
+            if self._started_pid == pid:
+                return
+            if pid != self._owner_pid:
+                # Соединения пула скопированы из родителя при fork: общее соединение
+                # двух процессов ломает протокол (PostgreSQL), у ребенка должны быть свои
+                with self.app.app_context():
+                    db.engine.dispose(close=False)
+            self.start()
+            self._started_pid = pid
+
+    def start(self):
+        # Идентификатор включает pid: после fork у каждого процесса свой
+        self.node_id = self.app.config.get('NODE_ID') or f'{socket.gethostname()}-{os.getpid()}'
+        self._stop.clear()
+        for number in range(self.threads):
+            threading.Thread(target=self._run, name=f'job-worker-{number}', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def wake(self):
+        """Разбудить воркеры после постановки задачи на этом узле"""
+        self._wakeup.set()
+
+    def _run(self):
+        config = self.app.config
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    job = claim_job(self.node_id, self.kinds, config['JOB_LEASE_SECONDS'], config['JOB_MAX_ATTEMPTS'])
+                    if job is not None:
+                        self._execute(job)
+                        continue
+            except Exception as e:
+                self.app.logger.warning('Ошибка очереди задач на узле %s: %s', self.node_id, e)
+            self._wakeup.wait(config['JOB_POLL_INTERVAL'])
+            self._wakeup.clear()
+
+    def _execute(self, job):
+        job_id, kind, payload = job.id, job.kind, job.payload
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, done),
+                                     name=f'job-heartbeat-{job_id}', daemon=True)
+        heartbeat.start()
+        try:
+            result, error = HANDLERS[kind](payload), None
+        except Exception as e:
+            result, error = None, str(e)
+        finally:
+            done.set()
+            heartbeat.join()
+        if not finish_job(job_id, self.node_id, result=result, error=error):
+            self.app.logger.warning('Задача #%s уже у другого узла, результат %s отброшен', job_id, self.node_id)
+
+    def _heartbeat(self, job_id, done):
+        config = self.app.config
+        while not done.wait(config['JOB_HEARTBEAT_INTERVAL']):
+            with self.app.app_context():
+                if not extend_lease(job_id, self.node_id, config['JOB_LEASE_SECONDS']):
+                    self.app.logger.warning('Узел %s потерял аренду задачи #%s', self.node_id, job_id)
+                    return
+
+
+def init_jobs(app):
+    """
+    Воркеры очереди задач на этом узле (если включен многоузловой режим)
+
+    Потоки стартуют не при создании приложения, а в каждом процессе перед первым
+    запросом. Узлу без входящего трафика нужен вызов из gunicorn.conf.py:
+        def post_fork(server, worker):
+            server.app.wsgi().extensions['job_worker'].ensure_started()
+    При JOB_WORKERS=0 потоков нет, но пул соединений после fork так же пересоздается.
+    """
+    if not app.config.get('ENABLE_JOB_QUEUE'):
+        return
+    worker = JobWorker(app, app.config['JOB_KINDS'], app.config['JOB_WORKERS'])
+    app.extensions['job_worker'] = worker
+    app.before_request(worker.ensure_started)
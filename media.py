@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import time
+
+from metrics import TRANSCRIBE_SECONDS
+
+
+def get_duration(filepath: str) -> float:
+    """
+    Получить длительность файла в секундах
+
+    Нужен только pydub (ffprobe), без Whisper: длительность считается на узле,
+    принявшем загрузку, даже если сама транскрибация выполняется на другом.
+    """
+    try:
+        start = time.perf_counter()
+        # pydub загружается при первом использовании
+        from pydub import AudioSegment
+        # pydub использует ffprobe под капотом, что очень эффективно
+        if filepath.lower().endswith('.mp3'):
+            audio = AudioSegment.from_mp3(filepath)
+        elif filepath.lower().endswith('.mp4'):
+            # Для MP4 извлекаем только метаданные, не весь файл
+            audio = AudioSegment.from_file(filepath, format="mp4")
+        else:
+            audio = AudioSegment.from_file(filepath)
+
+        # Длительность в секундах
+        duration_seconds = len(audio) / 1000.0
+        TRANSCRIBE_SECONDS.observe(time.perf_counter() - start, stage='get_duration')
+        return duration_seconds
+
+    except Exception as e:
+        raise Exception(f"Ошибка определения длительности: {str(e)}")
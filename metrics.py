@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей
+
+Запись - одно обращение к словарю под коротким локом на метрику, поэтому
+инструментирование можно держать включенным в продакшене. Значения хранятся
+в памяти процесса: при нескольких воркерах каждый отдает свои метрики.
+"""
+import os
+import shutil
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from admission import admission_stats
+
+# Границы бакетов по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = []
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонно растущий счетчик"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Гистограмма с фиксированными бакетами"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labelnames, key, ('le', _format_value(float(bound)))), cumulative)
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+def render(collectors=()) -> str:
+    """
+    Все метрики в текстовом формате Prometheus
+
+    collectors - функции, вычисляющие метрики в момент запроса; каждая возвращает
+    список (name, kind, documentation, [(labels_dict, value), ...]).
+    """
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{labels} {_format_value(value)}')
+    for collector in collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                labelnames = tuple(labels)
+                lines.append(f'{name}{_format_labels(labelnames, tuple(labels.values()))} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ====== Метрики приложения ======
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса до первого байта ответа',
+    ('endpoint', 'method', 'status'))
+
+TTS_SYNTHESIS_SECONDS = Histogram(
+    'tts_synthesis_seconds', 'Время синтеза речи edge-tts')
+TTS_SYNTHESIS_BYTES = Counter(
+    'tts_synthesis_bytes_total', 'Байт аудио, полученных от edge-tts')
+
+TRANSCRIBE_SECONDS = Histogram(
+    'transcribe_seconds', 'Время этапов транскрибации', ('stage',))
+TRANSCRIBE_REALTIME_FACTOR = Histogram(
+    'transcribe_realtime_factor', 'Время транскрибации / длительность записи',
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10))
+
+VIDEO_DOWNLOAD_SECONDS = Histogram(
+    'video_download_seconds', 'Время скачивания видео yt-dlp', ('platform',))
+VIDEO_DOWNLOAD_BYTES = Counter(
+    'video_download_bytes_total', 'Байт видео, скачанных yt-dlp', ('platform',))
+
+DB_COMMIT_SECONDS = Histogram(
+    'db_commit_seconds', 'Время фиксации транзакции БД',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+
+TOKENS_DEBITED = Counter(
+    'tokens_debited_total', 'Списано токенов', ('feature',))
+
+
+def init_metrics(app):
+    """Подключение метрик запросов, коммитов БД, диска и контроля нагрузки"""
+    if app.config.get('ENABLE_METRICS', True) and not app.config.get('METRICS_TOKEN') and not app.debug:
+        app.logger.warning('METRICS_TOKEN не задан: /metrics отвечает 403 (без токена доступен только в DEBUG)')
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    # Замер в after_request: для потоковых ответов (экспорт, ZIP пакетной озвучки)
+    # это время до начала отдачи, а не до ее окончания
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=request.endpoint or 'unknown',
+                                    method=request.method, status=response.status_code)
+        return response
+
+    if not getattr(init_metrics, '_db_listeners', False):
+        @event.listens_for(Session, 'before_commit')
+        def _commit_started(session):
+            session.info['metrics_commit_start'] = time.perf_counter()
+
+        @event.listens_for(Session, 'after_commit')
+        def _commit_finished(session):
+            start = session.info.pop('metrics_commit_start', None)
+            if start is not None:
+                DB_COMMIT_SECONDS.observe(time.perf_counter() - start)
+
+        init_metrics._db_listeners = True
+
+    folders = app.extensions['storage'].folders
+
+    def _disk_free():
+        samples = []
+        for name, path in folders.items():
+            if os.path.isdir(path):
+                samples.append(({'folder': name}, shutil.disk_usage(path).free))
+        return [('disk_free_bytes', 'gauge', 'Свободное место в папке с файлами', samples)]
+
+    def _admission():
+        stats = admission_stats(app)
+        return [
+            ('admission_in_flight', 'gauge', 'Запросов в работе',
+             [({'feature': name}, s['in_flight']) for name, s in stats.items()]),
+            ('admission_queue_depth', 'gauge', 'Запросов в очереди ожидания',
+             [({'feature': name}, s['queue_depth']) for name, s in stats.items()]),
+            ('admission_admitted_total', 'counter', 'Принято запросов',
+             [({'feature': name}, s['admitted']) for name, s in stats.items()]),
+            ('admission_rejected_total', 'counter', 'Отклонено запросов',
+             [({'feature': name, 'reason': reason}, count)
+              for name, s in stats.items() for reason, count in s['rejected'].items()]),
+        ]
+
+    app.extensions['metrics_collectors'] = [_disk_free, _admission]
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_hasher import get_hasher
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -21,11 +21,15 @@ class User(UserMixin, db.Model):
 
     def set_password(self, password):
         """Установить хэш пароля"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_hasher().hash(password)
 
     def check_password(self, password):
         """Проверить пароль"""
-        return check_password_hash(self.password_hash, password)
+        return get_hasher().verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Сохранен ли пароль с устаревшими параметрами хэширования"""
+        return get_hasher().needs_rehash(self.password_hash)
 
     def add_tokens(self, amount):
         """Добавить токены"""
@@ -58,13 +62,31 @@ class Conversion(db.Model):
         return f'<Conversion {self.id} by User {self.user_id}>'
 
 
+class Transcription(db.Model):
+    """История транскрибаций: результаты во всех форматах хранятся под общим именем"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    basename = db.Column(db.String(200), nullable=False)  # Имя файлов без расширения (.txt, .srt, .vtt, .json)
+    original_filename = db.Column(db.String(255))
+    language = db.Column(db.String(50))
+    duration_seconds = db.Column(db.Float)
+    tokens_used = db.Column(db.Integer, nullable=False)
+    word_timestamps = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('transcriptions', lazy='dynamic'))
+
+    def __repr__(self):
+        return f'<Transcription {self.id} by User {self.user_id}>'
+
+
 class TokenTransaction(db.Model):
     """История транзакций токенов"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     amount = db.Column(db.Integer, nullable=False)
-    transaction_type = db.Column(db.String(20))  # 'grant', 'use', 'revoke'
+    transaction_type = db.Column(db.String(20))  # 'grant', 'use', 'revoke', 'refund'
     note = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -72,4 +94,23 @@ class TokenTransaction(db.Model):
     admin = db.relationship('User', foreign_keys=[admin_id])
 
     def __repr__(self):
-        return f'<Transaction {self.id}: {self.amount} tokens>'
\ No newline at end of file
+        return f'<Transaction {self.id}: {self.amount} tokens>'
+
+
+class Job(db.Model):
+    """Задача для общей очереди: ее может выполнить любой узел (многоузловой режим)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'tts', 'video', 'transcribe'
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # 'queued', 'running', 'done', 'failed'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    payload = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON)
+    error = db.Column(db.String(500))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    lease_owner = db.Column(db.String(100))  # Узел, выполняющий задачу
+    lease_expires_at = db.Column(db.DateTime)  # Продлевается heartbeat'ом, после истечения задачу берет другой узел
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
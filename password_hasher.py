@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Все потоки хэширования заняты и очередь не освободилась вовремя"""
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method: str) -> str:
+    """Нормализованный префикс хэша для метода ('scrypt' -> 'scrypt:32768:8:1')"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Хэширование паролей в ограниченном пуле потоков"""
+
+    def __init__(self, method: str, max_workers: int, max_pending: int, timeout: float):
+        self.method = method
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        # Ограничиваем число задач в пуле, чтобы всплеск входов не копил бесконечную очередь
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy('Сервер перегружен, попробуйте через несколько секунд')
+        try:
+            future = self._pool.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password: str) -> str:
+        """Хэш пароля с текущими настройками"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """Проверка пароля (выполняется в пуле, не занимает поток запроса CPU-работой)"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Отличаются ли параметры сохраненного хэша от настроенных"""
+        return password_hash.split('$', 1)[0] != _method_prefix(self.method)
+
+
+def init_hasher(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        max_workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+
+
+def get_hasher() -> PasswordHasher:
+    """Хэшер текущего приложения"""
+    return current_app.extensions['password_hasher']
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+# Общие потоки, в которых выполняется работа запроса (edge-tts, yt-dlp, хэширование паролей, очередь задач)
+SHARED_THREAD_PREFIXES = ('async-runner', 'async-executor', 'password-hash', 'job-worker')
+
+# Верхние кадры простаивающих общих потоков: ожидание задачи в пуле и в event loop
+IDLE_FRAMES = {('thread.py', '_worker'), ('selectors.py', 'select')}
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """Семплирующий профайлер: снимает стеки потоков через заданный интервал"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _target_threads(self):
+        targets = {self.thread_id: 'request'}
+        for thread in threading.enumerate():
+            if thread.name.startswith(SHARED_THREAD_PREFIXES):
+                targets[thread.ident] = thread.name
+        return targets
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for thread_id, name in self._target_threads().items():
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            # Простаивающие общие потоки не интересны
+            if name != 'request' and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(name)
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """Стеки в свернутом формате (flamegraph.pl, speedscope)"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def profiling_requested() -> bool:
+    """Запрошено ли профилирование текущего запроса (только для админов)"""
+    if request.headers.get('X-Profile') != '1' and request.args.get('_profile') != '1':
+        return False
+    return current_user.is_authenticated and current_user.is_admin
+
+
+def list_profiles(folder: str) -> list:
+    """Сохраненные профили, новые первыми"""
+    if not os.path.isdir(folder):
+        return []
+    profiles = []
+    for filename in os.listdir(folder):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(folder, filename), encoding='utf-8') as f:
+            profiles.append(json.load(f))
+    profiles.sort(key=lambda meta: meta['name'], reverse=True)
+    return profiles
+
+
+def _save_profile(app, profiler, duration, response):
+    folder = app.config['PROFILE_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    name = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{request.endpoint or 'unknown'}"
+
+    with open(os.path.join(folder, f'{name}.folded'), 'w', encoding='utf-8') as f:
+        f.write(profiler.folded())
+    meta = {
+        'name': name,
+        'created_at': datetime.now().strftime('%d.%m.%Y %H:%M:%S'),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'user': current_user.email,
+        'duration_ms': round(duration * 1000, 1),
+        'samples': profiler.samples,
+        'top': [[stack.rsplit(';', 1)[-1], count] for stack, count in profiler.stacks.most_common(10)],
+    }
+    with open(os.path.join(folder, f'{name}.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Храним только последние PROFILE_KEEP профилей
+    for old in list_profiles(folder)[app.config['PROFILE_KEEP']:]:
+        for ext in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(folder, old['name'] + ext))
+            except OSError:
+                pass
+
+
+def init_profiler(app):
+    """Профилирование отдельных запросов по заголовку X-Profile: 1 или параметру ?_profile=1"""
+
+    @app.before_request
+    def _start_profiler():
+        if profiling_requested():
+            g.profiler = SamplingProfiler(threading.get_ident(), app.config['PROFILE_INTERVAL'])
+            g.profiler_start = time.perf_counter()
+            g.profiler.start()
+
+    @app.after_request
+    def _stop_profiler(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            _save_profile(app, profiler, time.perf_counter() - g.pop('profiler_start'), response)
+            response.headers['X-Profile-Samples'] = str(profiler.samples)
+        return response
+
+    @app.teardown_request
+    def _discard_profiler(exc):
+        # Если обработка завершилась исключением, after_request не вызывается
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Сборка статики: копии файлов из static/ с хэшем содержимого в имени
+(css/style.css -> css/style.3f2a9c1b7e04.css) и предсжатые варианты .gz/.br
+
+Запуск (после каждого изменения статики, перед деплоем):
+    python static_assets.py
+
+Brotli-варианты создаются, только если установлен пакет brotli.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+from flask import url_for
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Текстовые форматы, для которых есть смысл хранить сжатые варианты
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+# Сжатие, при котором вариант не сохраняется: выигрыш меньше 5%
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def _fingerprinted_name(relpath: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = os.path.splitext(relpath)
+    return f'{stem}.{digest}{ext}'
+
+
+def _write_compressed(path: str, content: bytes):
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    for suffix, data in variants.items():
+        if len(data) < len(content) * MIN_COMPRESSION_RATIO:
+            with open(path + suffix, 'wb') as f:
+                f.write(data)
+
+
+def build_assets(static_folder: str, output_folder: str) -> dict:
+    """Собрать статику в output_folder; возвращает манифест {исходное имя: имя с хэшем}"""
+    if os.path.isdir(output_folder):
+        shutil.rmtree(output_folder)
+    os.makedirs(output_folder)
+
+    manifest = {}
+    for root, _, files in os.walk(static_folder):
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            relpath = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+
+            hashed = _fingerprinted_name(relpath, content)
+            target = os.path.join(output_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+            if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                _write_compressed(target, content)
+            manifest[relpath] = hashed
+
+    with open(os.path.join(output_folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(output_folder: str) -> dict:
+    """Манифест собранной статики (пустой, если сборка не запускалась)"""
+    try:
+        with open(os.path.join(output_folder, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_static_assets(app):
+    """Функция asset_url() для шаблонов: ссылка на собранный файл или обычная статика"""
+    manifest = load_manifest(app.config['ASSETS_FOLDER'])
+    app.extensions['static_assets'] = manifest
+
+    @app.template_global()
+    def asset_url(filename):
+        hashed = manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets.asset', filename=hashed)
+
+
+if __name__ == '__main__':
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    result = build_assets(static_folder, Config.ASSETS_FOLDER)
+    for source, hashed in sorted(result.items()):
+        print(f'{source} -> {hashed}')
+    if brotli is None:
+        print('⚠️ Пакет brotli не установлен, созданы только .gz-варианты')
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+from flask import current_app
+
+# Области хранения и папки из конфига, которым они соответствуют
+AREAS = {
+    'audio': 'AUDIO_FOLDER',
+    'video': 'VIDEO_FOLDER',
+    'transcribe': 'TRANSCRIBE_FOLDER',
+}
+
+
+class LocalStorage:
+    """Файлы в локальных папках из конфига (один узел)"""
+
+    def __init__(self, folders: dict):
+        self.folders = folders
+
+    def makedirs(self):
+        for folder in self.folders.values():
+            os.makedirs(folder, exist_ok=True)
+
+    def folder(self, area: str) -> str:
+        return self.folders[area]
+
+    def path(self, area: str, name: str) -> str:
+        """Путь к файлу области (имя без каталогов)"""
+        return os.path.join(self.folders[area], os.path.basename(name))
+
+    def exists(self, area: str, name: str) -> bool:
+        return os.path.isfile(self.path(area, name))
+
+    def delete(self, area: str, name: str):
+        try:
+            os.remove(self.path(area, name))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def writer(self, area: str, name: str):
+        """Путь, по которому нужно записать файл области"""
+        yield self.path(area, name)
+
+    def import_file(self, source: str, area: str, name: str | None = None) -> str:
+        """Переместить готовый файл в область; возвращает его имя"""
+        name = os.path.basename(name or source)
+        target = self.path(area, name)
+        if os.path.abspath(source) != os.path.abspath(target):
+            shutil.move(source, target)
+        return name
+
+
+class SharedVolumeStorage(LocalStorage):
+    """
+    Общий том (NFS, EFS, CephFS), смонтированный на всех узлах
+
+    Файл пишется во временный рядом с целевым и появляется под своим именем
+    только целиком (fsync + rename), поэтому другой узел не увидит недописанный файл.
+    Подпапки называются как локальные (audio_files, ...), так что X-Accel-Redirect
+    работает с alias на корень тома.
+    """
+
+    def __init__(self, root: str, folders: dict):
+        super().__init__({area: os.path.join(root, os.path.basename(folder)) for area, folder in folders.items()})
+        self.root = root
+
+    @staticmethod
+    def _fsync_dir(folder):
+        fd = os.open(folder, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _commit(self, tmp_path, target):
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, target)
+        self._fsync_dir(os.path.dirname(target))
+
+    @contextmanager
+    def writer(self, area: str, name: str):
+        target = self.path(area, name)
+        tmp_path = f'{target}.{uuid.uuid4().hex}.part'
+        try:
+            yield tmp_path
+            self._commit(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def import_file(self, source: str, area: str, name: str | None = None) -> str:
+        name = os.path.basename(name or source)
+        if os.path.abspath(source) == os.path.abspath(self.path(area, name)):
+            return name
+        # Файл с локального диска копируется во временный на томе и переименовывается
+        with self.writer(area, name) as tmp_path:
+            shutil.copyfile(source, tmp_path)
+        os.remove(source)
+        return name
+
+
+def create_storage(config) -> LocalStorage:
+    """Хранилище по настройке STORAGE_BACKEND"""
+    folders = {area: config[key] for area, key in AREAS.items()}
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage(folders)
+    if backend == 'shared':
+        if not config.get('SHARED_STORAGE_ROOT'):
+            raise ValueError('Для STORAGE_BACKEND=shared нужно задать SHARED_STORAGE_ROOT')
+        return SharedVolumeStorage(config['SHARED_STORAGE_ROOT'], folders)
+    raise ValueError(f'Неизвестный STORAGE_BACKEND: {backend}')
+
+
+def init_storage(app):
+    app.extensions['storage'] = create_storage(app.config)
+
+
+def get_storage() -> LocalStorage:
+    """Хранилище текущего приложения"""
+    return current_app.extensions['storage']
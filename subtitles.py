@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import json
+
+# Форматы результата транскрибации: расширение файла и MIME-тип
+TRANSCRIPT_FORMATS = {
+    'txt': ('.txt', 'text/plain'),
+    'srt': ('.srt', 'application/x-subrip'),
+    'vtt': ('.vtt', 'text/vtt'),
+    'json': ('.json', 'application/json'),
+}
+
+
+def compact_segments(segments, with_words=False) -> list:
+    """Сегменты Whisper без служебных полей (токены, вероятности)"""
+    compact = []
+    for segment in segments:
+        text = segment.get('text', '').strip()
+        if not text:
+            continue
+        entry = {'start': round(segment['start'], 3), 'end': round(segment['end'], 3), 'text': text}
+        if with_words:
+            entry['words'] = [
+                {'start': round(word['start'], 3), 'end': round(word['end'], 3), 'word': word['word'].strip()}
+                for word in segment.get('words', ())
+            ]
+        compact.append(entry)
+    return compact
+
+
+def assemble_text(text: str, segments) -> str:
+    """
+    Полный текст транскрипции с нормализованными пробелами
+
+    Собирается из сегментов (они покрывают весь текст Whisper) одним join;
+    разбиение на слова нужно, только если внутри остались лишние пробелы.
+    """
+    if segments:
+        text = ' '.join([segment['text'] for segment in segments])
+    else:
+        text = text.strip()
+    # Все пробельные символы, кроме обычного пробела, непечатаемые: проверки идут на скорости C
+    if '  ' in text or not text.isprintable():
+        text = ' '.join(text.split())
+    return text
+
+
+def format_timestamp(seconds: float, separator: str = ',') -> str:
+    """Время в формате ЧЧ:ММ:СС,ммм (SRT) или ЧЧ:ММ:СС.ммм (VTT)"""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}'
+
+
+def to_srt(segments) -> str:
+    return ''.join(
+        f"{number}\n{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n{segment['text']}\n\n"
+        for number, segment in enumerate(segments, start=1)
+    )
+
+
+def to_vtt(segments) -> str:
+    cues = ''.join(
+        f"{format_timestamp(segment['start'], '.')} --> {format_timestamp(segment['end'], '.')}\n{segment['text']}\n\n"
+        for segment in segments
+    )
+    return 'WEBVTT\n\n' + cues
+
+
+def render_transcript(text: str, language: str, segments) -> dict:
+    """Все форматы результата из одного прохода Whisper: {формат: содержимое}"""
+    return {
+        'txt': text,
+        'srt': to_srt(segments),
+        'vtt': to_vtt(segments),
+        'json': json.dumps({'language': language, 'text': text, 'segments': segments}, ensure_ascii=False, indent=2),
+    }
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+
+# Компактные форматы отдачи: суффикс файла рядом с оригиналом и параметры ffmpeg
+# edge-tts отдает MP3 48 кбит/с моно, поэтому оригинал - формат 'mp3'
+OUTPUT_FORMATS = {
+    'mp3': None,
+    'mp3_low': {
+        'suffix': '.low.mp3',
+        'mimetype': 'audio/mpeg',
+        'args': ['-c:a', 'libmp3lame', '-b:a', '32k', '-ac', '1', '-f', 'mp3'],
+    },
+    'opus': {
+        'suffix': '.opus.webm',
+        'mimetype': 'audio/webm',
+        'args': ['-c:a', 'libopus', '-b:a', '24k', '-ac', '1', '-application', 'voip', '-f', 'webm'],
+    },
+}
+
+
+class Transcoder:
+    """Перекодирование аудио в фоновом пуле с кэшем вариантов рядом с оригиналом"""
+
+    def __init__(self, max_workers: int, timeout: float):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='transcode')
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def variant_path(filepath: str, output_format: str) -> str:
+        """Путь к варианту файла в заданном формате"""
+        spec = OUTPUT_FORMATS[output_format]
+        if spec is None:
+            return filepath
+        return os.path.splitext(filepath)[0] + spec['suffix']
+
+    @staticmethod
+    def mimetype(output_format: str) -> str | None:
+        spec = OUTPUT_FORMATS[output_format]
+        return spec['mimetype'] if spec else None
+
+    def _transcode_sync(self, source: str, target: str, output_format: str):
+        # Уникальное имя: тот же вариант могут одновременно перекодировать другие
+        # процессы и узлы на общем томе, _pending защищает только внутри процесса
+        tmp_path = f'{target}.{uuid.uuid4().hex}.part'
+        try:
+            subprocess.run(
+                ['ffmpeg', '-loglevel', 'error', '-y', '-i', source, '-vn',
+                 *OUTPUT_FORMATS[output_format]['args'], tmp_path],
+                check=True, capture_output=True, timeout=self.timeout,
+            )
+            # Атомарная замена: параллельный запрос не увидит недописанный файл
+            os.replace(tmp_path, target)
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка перекодирования: {e.stderr.decode(errors='replace').strip()}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def transcode(self, filepath: str, output_format: str) -> str:
+        """Получить файл в нужном формате (из кэша или перекодировав)"""
+        target = self.variant_path(filepath, output_format)
+        if target == filepath or os.path.exists(target):
+            return target
+
+        with self._lock:
+            # Один и тот же вариант перекодируется только один раз
+            future = self._pending.get(target)
+            if future is None:
+                future = self._pool.submit(self._transcode_sync, filepath, target, output_format)
+                self._pending[target] = future
+                future.add_done_callback(lambda _: self._pending.pop(target, None))
+        try:
+            future.result(self.timeout)
+        except FutureTimeoutError:
+            raise Exception('Превышено время перекодирования')
+        return target
+
+
+def init_transcoder(app):
+    app.extensions['transcoder'] = Transcoder(
+        max_workers=app.config['TRANSCODE_WORKERS'],
+        timeout=app.config['TRANSCODE_TIMEOUT'],
+    )
+
+
+def get_transcoder() -> Transcoder:
+    """Транскодер текущего приложения"""
+    return current_app.extensions['transcoder']
@@ -1,20 +1,29 @@
 import os
 import asyncio
 import re
+import time
 from typing import Tuple
 
-import yt_dlp
+from flask import current_app
+
+from metrics import VIDEO_DOWNLOAD_SECONDS, VIDEO_DOWNLOAD_BYTES
 
 
 TIKTOK_PATTERN = r"(https?://(?:www\.)?tiktok\.com/[^\s]+)"
 YOUTUBE_PATTERN = r"(https?://(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)[^\s]+)"
 REELS_PATTERN = r"(https?://(?:www\.)?instagram\.com/(?:reel|reels)/[^\s]+)"
 
+# Порядок проверки платформ, шаблоны компилируются один раз при импорте
+PLATFORM_PATTERNS = (
+    ("TikTok", re.compile(TIKTOK_PATTERN)),
+    ("YouTube", re.compile(YOUTUBE_PATTERN)),
+    ("Reels", re.compile(REELS_PATTERN)),
+)
+
 
 class VideoDownloader:
     def __init__(self, output_dir: str):
         self.output_dir = output_dir
-        os.makedirs(self.output_dir, exist_ok=True)
 
     def get_ydl_opts(self, platform: str):
         return {
@@ -33,7 +42,11 @@ class VideoDownloader:
         }
 
     def _download_sync(self, url: str, platform: str) -> Tuple[str, str]:
+        # yt_dlp загружается при первом скачивании, определение платформы его не требует
+        import yt_dlp
+        os.makedirs(self.output_dir, exist_ok=True)
         try:
+            start = time.perf_counter()
             with yt_dlp.YoutubeDL(self.get_ydl_opts(platform)) as ydl:
                 info = ydl.extract_info(url, download=True)
 
@@ -46,22 +59,22 @@ class VideoDownloader:
                         filename = possible_mp4
 
                 title = info.get("title", "Video")
+                VIDEO_DOWNLOAD_SECONDS.observe(time.perf_counter() - start, platform=platform)
+                if os.path.exists(filename):
+                    VIDEO_DOWNLOAD_BYTES.inc(os.path.getsize(filename), platform=platform)
                 return filename, title
         except Exception as e:
             raise Exception(f"Ошибка скачивания: {str(e)}")
 
     async def download_video(self, url: str, platform: str) -> Tuple[str, str]:
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self._download_sync, url, platform)
 
     @staticmethod
     def detect_platform(url: str) -> str | None:
-        if re.search(TIKTOK_PATTERN, url):
-            return "TikTok"
-        if re.search(YOUTUBE_PATTERN, url):
-            return "YouTube"
-        if re.search(REELS_PATTERN, url):
-            return "Reels"
+        for platform, pattern in PLATFORM_PATTERNS:
+            if pattern.search(url):
+                return platform
         return None
 
     def cleanup(self, filepath: str):
@@ -77,11 +90,10 @@ class VideoDownloader:
             pass
 
 
-downloader = VideoDownloader(
-    output_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "video_files")
-)
-
-
-
+def init_downloader(app):
+    app.extensions['video_downloader'] = VideoDownloader(output_dir=app.config['VIDEO_FOLDER'])
 
 
+def get_downloader() -> VideoDownloader:
+    """Загрузчик текущего приложения"""
+    return current_app.extensions['video_downloader']
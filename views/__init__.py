@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from views import main, auth, tts, video, transcribe, admin, profile, pricing, metrics, assets
+
+# Все blueprints регистрируются всегда: тяжелые зависимости (edge_tts, yt_dlp, whisper)
+# импортируются внутри маршрутов при первом использовании, а флаги ENABLE_*
+# проверяются в самих маршрутах
+BLUEPRINTS = [
+    main.bp,
+    auth.bp,
+    tts.bp,
+    video.bp,
+    transcribe.bp,
+    admin.bp,
+    profile.bp,
+    pricing.bp,
+    metrics.bp,
+    assets.bp,
+]
+
+
+def register_blueprints(app):
+    """Регистрация всех разделов сайта"""
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+import io
+import re
+import csv
+import json
+from datetime import datetime, timedelta
+
+from flask import (Blueprint, current_app, render_template, redirect, url_for, flash, request,
+                   Response, stream_with_context, jsonify, send_from_directory, abort)
+from flask_login import login_required, current_user
+from sqlalchemy import insert, update, bindparam
+
+from models import db, User, Conversion, TokenTransaction
+from forms import GrantTokensForm, GrantAdminForm, BulkGrantTokensForm
+from admission import admission_stats
+from profiler import list_profiles
+
+bp = Blueprint('admin', __name__)
+
+
+def parse_bulk_grant_csv(file):
+    """Разбор CSV для массовой выдачи: строки email,tokens,note"""
+    rows = []
+    reader = csv.reader(io.TextIOWrapper(file.stream, encoding='utf-8-sig'))
+    for line, record in enumerate(reader, start=1):
+        if not record or not any(field.strip() for field in record):
+            continue
+        email = record[0].strip()
+        tokens = record[1].strip() if len(record) > 1 else ''
+        note = record[2].strip() if len(record) > 2 else ''
+        # Пропускаем строку заголовка
+        if line == 1 and email.lower() == 'email':
+            continue
+        rows.append({'line': line, 'email': email, 'tokens': tokens, 'note': note})
+    return rows
+
+
+def bulk_grant_tokens(rows, admin_id):
+    """
+    Массовая выдача токенов в одной транзакции
+
+    Пользователи ищутся одним запросом IN, балансы обновляются пакетным UPDATE,
+    записи в журнал добавляются пакетным INSERT.
+
+    Returns:
+        list: отчет по каждой строке (line, email, tokens, status, message)
+    """
+    report = []
+    valid = []
+    for row in rows:
+        entry = {'line': row['line'], 'email': row['email'], 'tokens': 0, 'status': 'error'}
+        try:
+            tokens = int(row['tokens'])
+        except ValueError:
+            entry['message'] = 'Некорректное количество токенов'
+        else:
+            entry['tokens'] = tokens
+            if not row['email']:
+                entry['message'] = 'Не указан email'
+            elif tokens == 0:
+                entry['message'] = 'Количество токенов не может быть 0'
+            elif len(row['note']) > 200:
+                entry['message'] = 'Примечание длиннее 200 символов'
+            else:
+                valid.append((entry, row['note']))
+        report.append(entry)
+
+    emails = {entry['email'] for entry, _ in valid}
+    user_ids = {}
+    if emails:
+        user_ids = dict(db.session.query(User.email, User.id).filter(User.email.in_(emails)).all())
+
+    balances = {}
+    transactions = []
+    for entry, note in valid:
+        user_id = user_ids.get(entry['email'])
+        if user_id is None:
+            entry['message'] = 'Пользователь не найден'
+            continue
+        balances[user_id] = balances.get(user_id, 0) + entry['tokens']
+        transactions.append({
+            'user_id': user_id,
+            'admin_id': admin_id,
+            'amount': entry['tokens'],
+            'transaction_type': 'grant',
+            'note': note or 'Массовая выдача администратором',
+        })
+        entry['status'] = 'ok'
+        entry['message'] = 'Выдано'
+
+    if balances:
+        user_table = User.__table__
+        db.session.execute(
+            update(user_table)
+            .where(user_table.c.id == bindparam('b_user_id'))
+            .values(tokens=user_table.c.tokens + bindparam('b_amount')),
+            [{'b_user_id': user_id, 'b_amount': amount} for user_id, amount in balances.items()]
+        )
+        db.session.execute(insert(TokenTransaction.__table__), transactions)
+    db.session.commit()
+
+    return report
+
+
+@bp.route('/admin', methods=['GET', 'POST'])
+@login_required
+def index():
+    """Админ-панель"""
+    if not current_app.config.get('ENABLE_ADMIN', True):
+        flash('Админ-панель отключена', 'warning')
+        return redirect(url_for('main.index'))
+    
+    if not current_user.is_admin:
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('tts.dashboard'))
+
+    form = GrantTokensForm()
+    admin_form = GrantAdminForm()
+    bulk_form = BulkGrantTokensForm()
+    bulk_report = None
+
+    # Обработка выдачи админ-статуса (проверяем первым, так как у него меньше полей)
+    if request.method == 'POST' and 'grant_admin' in request.form:
+        if admin_form.validate():
+            user = User.query.filter_by(email=admin_form.email.data).first()
+            if user:
+                if user.id == current_user.id:
+                    flash('Нельзя изменить свой собственный статус', 'warning')
+                else:
+                    user.is_admin = True
+                    db.session.commit()
+                    flash(f'Пользователю {user.email} выдан админ-статус', 'success')
+            else:
+                flash('Пользователь не найден', 'danger')
+
+    # Массовая выдача токенов из CSV
+    elif request.method == 'POST' and 'bulk_grant' in request.form:
+        if bulk_form.validate():
+            try:
+                rows = parse_bulk_grant_csv(bulk_form.file.data)
+                bulk_report = bulk_grant_tokens(rows, current_user.id)
+            except (UnicodeDecodeError, csv.Error) as e:
+                flash(f'Не удалось прочитать CSV (нужен файл в кодировке UTF-8): {str(e)}', 'danger')
+            except Exception as e:
+                db.session.rollback()
+                flash(f'Ошибка массовой выдачи, изменения отменены: {str(e)}', 'danger')
+            else:
+                granted = [row for row in bulk_report if row['status'] == 'ok']
+                total = sum(row['tokens'] for row in granted)
+                flash(f'Массовая выдача: {len(granted)} из {len(bulk_report)} строк, '
+                      f'всего {total} токенов', 'success')
+
+    # Обработка выдачи токенов
+    elif form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data).first()
+        if user:
+            user.add_tokens(form.tokens.data)
+
+            # Запись транзакции
+            transaction = TokenTransaction(
+                user_id=user.id,
+                admin_id=current_user.id,
+                amount=form.tokens.data,
+                transaction_type='grant',
+                note=form.note.data or 'Выдано администратором'
+            )
+            db.session.add(transaction)
+            db.session.commit()
+
+            flash(f'Пользователю {user.email} выдано {form.tokens.data} токенов', 'success')
+        else:
+            flash('Пользователь не найден', 'danger')
+
+    # Статистика
+    users = User.query.all()
+    total_users = len(users)
+    total_conversions = Conversion.query.count()
+    recent_transactions = TokenTransaction.query.order_by(TokenTransaction.created_at.desc()).limit(20).all()
+
+    return render_template('admin.html',
+                           form=form,
+                           admin_form=admin_form,
+                           bulk_form=bulk_form,
+                           bulk_report=bulk_report,
+                           users=users,
+                           total_users=total_users,
+                           total_conversions=total_conversions,
+                           recent_transactions=recent_transactions)
+
+
+# Размер пачки строк, читаемых из БД при потоковой выгрузке
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_columns(kind):
+    """Колонки и модель для выгрузки истории"""
+    if kind == 'transactions':
+        return TokenTransaction, [
+            ('id', TokenTransaction.id),
+            ('created_at', TokenTransaction.created_at),
+            ('user_id', TokenTransaction.user_id),
+            ('user_email', User.email),
+            ('admin_id', TokenTransaction.admin_id),
+            ('amount', TokenTransaction.amount),
+            ('transaction_type', TokenTransaction.transaction_type),
+            ('note', TokenTransaction.note),
+        ]
+    if kind == 'conversions':
+        return Conversion, [
+            ('id', Conversion.id),
+            ('created_at', Conversion.created_at),
+            ('user_id', Conversion.user_id),
+            ('user_email', User.email),
+            ('text_length', Conversion.text_length),
+            ('tokens_used', Conversion.tokens_used),
+            ('voice_used', Conversion.voice_used),
+            ('filename', Conversion.filename),
+        ]
+    return None, None
+
+
+def _parse_export_date(value):
+    """Разбор даты из фильтра выгрузки (ГГГГ-ММ-ДД)"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+class _EchoBuffer:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _format_export_value(value):
+    """Приведение значения к виду для выгрузки"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_export_csv(header, rows):
+    """Построчная генерация CSV без накопления в памяти"""
+    writer = csv.writer(_EchoBuffer())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_format_export_value(value) for value in row])
+
+
+def iter_export_jsonl(header, rows):
+    """Построчная генерация JSONL без накопления в памяти"""
+    for row in rows:
+        record = {name: _format_export_value(value) for name, value in zip(header, row)}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+@bp.route('/admin/export/<kind>')
+@login_required
+def export(kind):
+    """Потоковая выгрузка транзакций или конвертаций (CSV/JSONL)"""
+    if not current_app.config.get('ENABLE_ADMIN', True):
+        flash('Админ-панель отключена', 'warning')
+        return redirect(url_for('main.index'))
+
+    if not current_user.is_admin:
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('tts.dashboard'))
+
+    model, columns = _export_columns(kind)
+    if model is None:
+        flash('Неизвестный тип выгрузки', 'danger')
+        return redirect(url_for('admin.index'))
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        flash('Поддерживаются только форматы CSV и JSONL', 'danger')
+        return redirect(url_for('admin.index'))
+
+    try:
+        date_from = _parse_export_date(request.args.get('date_from'))
+        date_to = _parse_export_date(request.args.get('date_to'))
+    except ValueError:
+        flash('Дата должна быть в формате ГГГГ-ММ-ДД', 'danger')
+        return redirect(url_for('admin.index'))
+
+    header = [name for name, _ in columns]
+    query = (db.session.query(*[column for _, column in columns])
+             .join(User, model.user_id == User.id))
+
+    if date_from:
+        query = query.filter(model.created_at >= date_from)
+    if date_to:
+        # Включительно: до начала следующего дня
+        query = query.filter(model.created_at < date_to + timedelta(days=1))
+
+    email = request.args.get('email', '').strip()
+    if email:
+        query = query.filter(User.email == email)
+    user_id = request.args.get('user_id', type=int)
+    if user_id:
+        query = query.filter(model.user_id == user_id)
+
+    # Серверный курсор: строки читаются пачками, память не растет с размером истории
+    rows = query.order_by(model.id).yield_per(EXPORT_BATCH_SIZE)
+
+    if export_format == 'csv':
+        body = iter_export_csv(header, rows)
+        mimetype = 'text/csv'
+    else:
+        body = iter_export_jsonl(header, rows)
+        mimetype = 'application/x-ndjson'
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    download_name = f'{kind}_{timestamp}.{export_format}'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={download_name}',
+            # Отключаем буферизацию на прокси, чтобы отдача начиналась сразу
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+@bp.route('/admin/capacity')
+@login_required
+def capacity():
+    """Загрузка функций: запросы в работе, глубина очереди, отказы"""
+    if not current_app.config.get('ENABLE_ADMIN', True) or not current_user.is_admin:
+        return jsonify(error='Доступ запрещен'), 403
+    return jsonify(admission_stats(current_app))
+
+
+@bp.route('/admin/profiles')
+@login_required
+def profiles():
+    """Сохраненные профили запросов"""
+    if not current_app.config.get('ENABLE_ADMIN', True):
+        flash('Админ-панель отключена', 'warning')
+        return redirect(url_for('main.index'))
+
+    if not current_user.is_admin:
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('tts.dashboard'))
+
+    return render_template('admin_profiles.html', profiles=list_profiles(current_app.config['PROFILE_FOLDER']))
+
+
+@bp.route('/admin/profiles/<name>.folded')
+@login_required
+def profile_download(name):
+    """Скачивание профиля в свернутом формате"""
+    if not current_app.config.get('ENABLE_ADMIN', True) or not current_user.is_admin:
+        abort(403)
+    if not re.fullmatch(r'profile_[\w.]+', name):
+        abort(404)
+    return send_from_directory(current_app.config['PROFILE_FOLDER'], f'{name}.folded',
+                               as_attachment=True, mimetype='text/plain')
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import mimetypes
+import os
+
+from flask import Blueprint, current_app, request, send_from_directory, abort
+from werkzeug.security import safe_join
+
+from static_assets import MANIFEST_NAME
+
+bp = Blueprint('assets', __name__)
+
+# Предсжатые варианты в порядке предпочтения
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Собранная статика: имя содержит хэш, поэтому файл кэшируется навсегда"""
+    if filename == MANIFEST_NAME:
+        abort(404)
+    folder = current_app.config['ASSETS_FOLDER']
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encoding = None
+    for name, suffix in PRECOMPRESSED:
+        path = safe_join(folder, filename + suffix)
+        if request.accept_encodings[name] and path and os.path.isfile(path):
+            encoding = name
+            filename += suffix
+            break
+
+    response = send_from_directory(folder, filename, mimetype=mimetype, conditional=True, etag=True,
+                                   max_age=current_app.config['ASSETS_MAX_AGE'])
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
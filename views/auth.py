@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
+from flask_login import login_user, logout_user, login_required, current_user
+
+from models import db, User
+from forms import RegistrationForm, LoginForm
+from password_hasher import PasswordHasherBusy
+
+bp = Blueprint('auth', __name__)
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """Регистрация пользователя"""
+    if current_user.is_authenticated:
+        # Редирект на первую доступную страницу
+        if current_app.config.get('ENABLE_TTS', True):
+            return redirect(url_for('tts.dashboard'))
+        elif current_app.config.get('ENABLE_VIDEO_DOWNLOAD', True):
+            return redirect(url_for('video.index'))
+        elif current_app.config.get('ENABLE_TRANSCRIBE', True):
+            return redirect(url_for('transcribe.index'))
+        else:
+            return redirect(url_for('main.index'))
+
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        user = User(email=form.email.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('register.html', form=form), 503
+        user.tokens = 100  # Бонусные токены при регистрации
+        db.session.add(user)
+        db.session.commit()
+
+        flash('Регистрация успешна! Вам начислено 100 бонусных токенов.', 'success')
+        return redirect(url_for('auth.login'))
+
+    return render_template('register.html', form=form)
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Вход в систему"""
+    if current_user.is_authenticated:
+        return redirect(url_for('tts.dashboard'))
+
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data).first()
+        try:
+            password_ok = user is not None and user.check_password(form.password.data)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('login.html', form=form), 503
+
+        # Прозрачный перехэш, если параметры KDF изменились в конфиге
+        if password_ok and user.password_needs_rehash():
+            try:
+                user.set_password(form.password.data)
+                db.session.commit()
+            except PasswordHasherBusy:
+                # Пароль уже проверен: вход не откладываем, перехэш будет при следующем входе
+                pass
+
+        if password_ok:
+            login_user(user)
+            next_page = request.args.get('next')
+            flash(f'Добро пожаловать, {user.email}!', 'success')
+            if next_page:
+                return redirect(next_page)
+            # Редирект на первую доступную страницу
+            if current_app.config.get('ENABLE_TTS', True):
+                return redirect(url_for('tts.dashboard'))
+            elif current_app.config.get('ENABLE_VIDEO_DOWNLOAD', True):
+                return redirect(url_for('video.index'))
+            elif current_app.config.get('ENABLE_TRANSCRIBE', True):
+                return redirect(url_for('transcribe.index'))
+            else:
+                return redirect(url_for('main.index'))
+        else:
+            flash('Неверный email или пароль', 'danger')
+
+    return render_template('login.html', form=form)
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """Выход из системы"""
+    logout_user()
+    flash('Вы вышли из системы', 'info')
+    return redirect(url_for('main.index'))
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, render_template
+from flask_login import current_user
+
+from helpers import render_fragment, conditional_page
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/')
+def index():
+    """Главная страница"""
+    authenticated = current_user.is_authenticated
+    hero_html = render_fragment('_index_hero.html', key=authenticated, authenticated=authenticated)
+    return conditional_page(render_template('index.html', hero_html=hero_html))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, current_app, request, Response, abort
+
+import metrics
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics')
+def index():
+    """Метрики в формате Prometheus"""
+    if not current_app.config.get('ENABLE_METRICS', True):
+        abort(404)
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        # Метрики раскрывают трафик по эндпоинтам, очереди и место на диске:
+        # без токена они открыты только в режиме отладки
+        if not current_app.debug:
+            abort(403)
+    elif request.headers.get('Authorization') != f'Bearer {token}':
+        abort(403)
+    return Response(metrics.render(current_app.extensions.get('metrics_collectors', ())), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash
+from flask_login import current_user
+
+from helpers import render_fragment, conditional_page
+
+bp = Blueprint('pricing', __name__)
+
+# Тарифы не меняются во время работы, поэтому карточки отрисовываются один раз
+PRICING_PLANS = (
+    {
+        'tokens': 100,
+        'price': 5,
+        'name': 'Базовый',
+        'description': 'Идеально для начала работы',
+        'popular': False
+    },
+    {
+        'tokens': 500,
+        'price': 15,
+        'name': 'Стандартный',
+        'description': 'Лучшее соотношение цены и качества',
+        'popular': True
+    },
+    {
+        'tokens': 1000,
+        'price': 25,
+        'name': 'Премиум',
+        'description': 'Максимальная выгода для активных пользователей',
+        'popular': False
+    },
+)
+
+
+@bp.route('/pricing')
+def index():
+    """Страница тарифов"""
+    if not current_app.config.get('ENABLE_PRICING', True):
+        flash('Страница тарифов отключена', 'warning')
+        return redirect(url_for('main.index'))
+    authenticated = current_user.is_authenticated
+    plans_html = render_fragment('_pricing_plans.html', key=authenticated,
+                                 pricing_plans=PRICING_PLANS, authenticated=authenticated)
+    return conditional_page(render_template('pricing.html', plans_html=plans_html))
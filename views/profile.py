@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from models import db
+from forms import ChangePasswordForm
+from password_hasher import PasswordHasherBusy
+
+bp = Blueprint('profile', __name__)
+
+
+@bp.route('/profile', methods=['GET', 'POST'])
+@login_required
+def index():
+    """Профиль пользователя"""
+    if not current_app.config.get('ENABLE_PROFILE', True):
+        flash('Функция профиля отключена', 'warning')
+        return redirect(url_for('main.index'))
+    
+    form = ChangePasswordForm()
+
+    if form.validate_on_submit():
+        try:
+            if not current_user.check_password(form.current_password.data):
+                flash('Неверный текущий пароль', 'danger')
+            else:
+                current_user.set_password(form.new_password.data)
+                db.session.commit()
+                flash('Пароль успешно изменен', 'success')
+                return redirect(url_for('profile.index'))
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('profile.html', form=form, user=current_user), 503
+
+    return render_template('profile.html', form=form, user=current_user)
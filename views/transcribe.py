@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import os
+import uuid
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, abort, request
+from flask_login import login_required, current_user
+
+from models import db, TokenTransaction, Transcription
+from forms import TranscribeForm
+from admission import limit_concurrency
+from metrics import TOKENS_DEBITED
+from helpers import send_stored_file
+from storage import get_storage
+from jobs import job_handler, run_job
+from subtitles import TRANSCRIPT_FORMATS, render_transcript
+from media import get_duration
+
+bp = Blueprint('transcribe', __name__)
+
+
+@job_handler('transcribe')
+def transcribe_job(payload):
+    """
+    Задача транскрибации: результат во всех форматах записывается в хранилище
+
+    SRT/VTT/JSON строятся из сегментов того же прохода Whisper, загруженный файл удаляется.
+    """
+    # whisper и torch загружаются при первом выполнении задачи
+    from transcriber import transcriber
+    storage = get_storage()
+    try:
+        text, used_language, segments = transcriber.transcribe(
+            storage.path('transcribe', payload['upload']),
+            language=payload['language'],
+            word_timestamps=payload.get('word_timestamps', False),
+            duration=payload.get('duration'),
+        )
+        if text:
+            for output_format, content in render_transcript(text, used_language, segments).items():
+                extension = TRANSCRIPT_FORMATS[output_format][0]
+                with storage.writer('transcribe', payload['basename'] + extension) as path:
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+    finally:
+        storage.delete('transcribe', payload['upload'])
+    return {'found_text': bool(text), 'language': used_language}
+
+
+def send_transcript(basename, output_format):
+    """Отдача результата транскрибации в выбранном формате"""
+    extension, mimetype = TRANSCRIPT_FORMATS[output_format]
+    filename = basename + extension
+    return send_stored_file(get_storage().path('transcribe', filename), filename, mimetype=mimetype)
+
+
+@bp.route('/transcribe', methods=['GET', 'POST'])
+@login_required
+@limit_concurrency('transcribe')
+def index():
+    """Страница транскрибации видео/аудио в текст"""
+    if not current_app.config.get('ENABLE_TRANSCRIBE', True):
+        flash('Функция транскрибации отключена', 'warning')
+        return redirect(url_for('main.index'))
+    
+    form = TranscribeForm()
+
+    if form.validate_on_submit():
+        file = form.file.data
+        
+        # Проверка расширения файла
+        filename = file.filename.lower()
+        if not (filename.endswith('.mp4') or filename.endswith('.mp3')):
+            flash('Поддерживаются только файлы MP4 и MP3', 'danger')
+            return render_template('transcribe.html', form=form, user=current_user)
+
+        try:
+            # Сохранение загруженного файла
+            # Суффикс не дает двум загрузкам в одну секунду записать в один файл
+            timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            file_ext = os.path.splitext(filename)[1]
+            upload_filename = f'upload_{current_user.id}_{timestamp}{file_ext}'
+            storage = get_storage()
+            upload_path = storage.path('transcribe', upload_filename)
+
+            # Загрузка пишется в хранилище целиком, чтобы ее мог взять другой узел
+            with storage.writer('transcribe', upload_filename) as path:
+                file.save(path)
+
+            # Получение длительности файла
+            duration_seconds = get_duration(upload_path)
+            duration_minutes = duration_seconds / 60.0
+            
+            # Расчет токенов (1 минута = 10 токенов)
+            tokens_needed = int(duration_minutes * 10)
+            if tokens_needed < 1:
+                tokens_needed = 1  # Минимум 1 токен
+
+            if current_user.tokens < tokens_needed:
+                os.remove(upload_path)  # Удаляем загруженный файл
+                flash(
+                    f'Недостаточно токенов! Нужно: {tokens_needed} токенов ({duration_minutes:.1f} мин), '
+                    f'у вас: {current_user.tokens}',
+                    'warning'
+                )
+                return render_template('transcribe.html', form=form, user=current_user)
+
+            # Транскрибация с выбранным языком (в многоузловом режиме - на любом свободном узле)
+            # Текст сохраняется в файл, загруженный файл удаляется
+            basename = f'transcribe_{current_user.id}_{timestamp}'
+            result = run_job('transcribe', {
+                'upload': upload_filename,
+                'language': form.language.data,
+                'basename': basename,
+                'word_timestamps': form.word_timestamps.data,
+                'duration': duration_seconds,
+            }, user_id=current_user.id)
+            used_language = result['language']
+
+            if not result['found_text']:
+                flash('Не удалось извлечь текст из файла. Возможно, в файле нет звука.', 'danger')
+                return render_template('transcribe.html', form=form, user=current_user)
+
+            # Списание токенов
+            current_user.use_tokens(tokens_needed)
+            TOKENS_DEBITED.inc(tokens_needed, feature='transcribe')
+
+            # Запись транзакции
+            transaction = TokenTransaction(
+                user_id=current_user.id,
+                amount=-tokens_needed,
+                transaction_type='use',
+                note=f'Транскрибация ({duration_minutes:.1f} мин, {used_language})'
+            )
+            db.session.add(transaction)
+
+            # Сохранение в историю: все форматы можно скачать позже без повторной транскрибации
+            db.session.add(Transcription(
+                user_id=current_user.id,
+                basename=basename,
+                original_filename=file.filename,
+                language=used_language,
+                duration_seconds=duration_seconds,
+                tokens_used=tokens_needed,
+                word_timestamps=form.word_timestamps.data,
+            ))
+            db.session.commit()
+
+            flash(
+                f'Транскрибация завершена! Использовано {tokens_needed} токенов. '
+                f'Язык: {used_language}. Осталось токенов: {current_user.tokens}',
+                'success'
+            )
+            
+            return send_transcript(basename, form.output_format.data)
+
+        except Exception as e:
+            # Удаление временного файла в случае ошибки
+            try:
+                if 'upload_path' in locals() and os.path.exists(upload_path):
+                    os.remove(upload_path)
+            except:
+                pass
+            
+            flash(f'Ошибка транскрибации: {str(e)}', 'danger')
+
+    transcriptions = current_user.transcriptions.order_by(Transcription.created_at.desc()).limit(10).all()
+    return render_template('transcribe.html', form=form, user=current_user, transcriptions=transcriptions)
+
+
+@bp.route('/transcribe/<int:transcription_id>/download')
+@login_required
+def download_transcription(transcription_id):
+    """Скачивание результата из истории в любом формате без повторного запуска Whisper"""
+    transcription = db.session.get(Transcription, transcription_id)
+    if transcription is None or (transcription.user_id != current_user.id and not current_user.is_admin):
+        abort(404)
+
+    output_format = request.args.get('format', 'txt')
+    if output_format not in TRANSCRIPT_FORMATS:
+        abort(404)
+    if not get_storage().exists('transcribe', transcription.basename + TRANSCRIPT_FORMATS[output_format][0]):
+        flash('Файл больше недоступен', 'warning')
+        return redirect(url_for('transcribe.index'))
+    return send_transcript(transcription.basename, output_format)
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import shutil
+import asyncio
+import tempfile
+import zipfile
+from datetime import datetime
+
+from flask import (Blueprint, current_app, render_template, redirect, url_for, flash, abort, request,
+                   Response, stream_with_context, jsonify)
+from flask_login import login_required, current_user
+from sqlalchemy import update
+
+from models import db, User, Conversion, TokenTransaction
+from forms import TTSForm, VOICES
+from admission import limit_concurrency, acquire_slot
+from helpers import clean_text_for_tts, calculate_tokens_needed, send_stored_file
+from async_runner import get_runner
+from storage import get_storage
+from jobs import job_handler, run_job
+from transcoder import get_transcoder, OUTPUT_FORMATS
+from metrics import TTS_SYNTHESIS_SECONDS, TTS_SYNTHESIS_BYTES, TOKENS_DEBITED
+
+bp = Blueprint('tts', __name__)
+
+
+async def generate_audio(text, voice, output_path):
+    """Генерация аудио"""
+    # edge_tts загружается при первом использовании
+    import edge_tts
+    start = time.perf_counter()
+    communicate = edge_tts.Communicate(text, voice)
+    await communicate.save(output_path)
+    TTS_SYNTHESIS_SECONDS.observe(time.perf_counter() - start)
+    TTS_SYNTHESIS_BYTES.inc(os.path.getsize(output_path))
+
+
+@job_handler('tts')
+def synthesize_job(payload):
+    """Задача синтеза: аудио записывается в хранилище"""
+    with get_storage().writer('audio', payload['filename']) as path:
+        get_runner().run(generate_audio(payload['text'], payload['voice'], path))
+    return {'filename': payload['filename']}
+
+
+def send_audio_variant(filepath, output_format):
+    """
+    Отдача аудио в выбранном формате с отчетом об экономии в заголовках
+
+    Если перекодирование не удалось, отдается оригинальный MP3.
+    """
+    transcoder = get_transcoder()
+    original_size = os.path.getsize(filepath)
+    try:
+        variant_path = transcoder.transcode(filepath, output_format)
+    except Exception as e:
+        current_app.logger.warning('Перекодирование %s в %s не удалось: %s', filepath, output_format, e)
+        output_format, variant_path = 'mp3', filepath
+
+    variant_size = os.path.getsize(variant_path)
+    response = send_stored_file(variant_path, os.path.basename(variant_path),
+                                mimetype=transcoder.mimetype(output_format))
+    response.headers['X-Original-Size'] = str(original_size)
+    response.headers['X-Delivered-Size'] = str(variant_size)
+    response.headers['X-Bytes-Saved'] = str(original_size - variant_size)
+    return response
+
+
+@bp.route('/dashboard', methods=['GET', 'POST'])
+@login_required
+@limit_concurrency('tts')
+def dashboard():
+    """Панель пользователя"""
+    if not current_app.config.get('ENABLE_TTS', True):
+        flash('Функция TTS отключена', 'warning')
+        return redirect(url_for('main.index'))
+    
+    form = TTSForm()
+
+    if form.validate_on_submit():
+        text = clean_text_for_tts(form.text.data)
+        text_length = len(text)
+        tokens_needed = calculate_tokens_needed(text_length)
+
+        if current_user.tokens < tokens_needed:
+            flash(f'Недостаточно токенов! Нужно: {tokens_needed}, У вас: {current_user.tokens}', 'warning')
+            return render_template('dashboard.html', form=form, user=current_user)
+
+        try:
+            # Генерация имени файла: суффикс не дает двум запросам в одну секунду писать в один файл
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'audio_{current_user.id}_{timestamp}_{uuid.uuid4().hex[:8]}.mp3'
+
+            # Создание аудио (в многоузловом режиме - на любом свободном узле)
+            run_job('tts', {'text': text, 'voice': form.voice.data, 'filename': filename},
+                    user_id=current_user.id)
+            filepath = get_storage().path('audio', filename)
+
+            # Списание токенов
+            current_user.use_tokens(tokens_needed)
+            TOKENS_DEBITED.inc(tokens_needed, feature='tts')
+
+            # Сохранение в историю
+            conversion = Conversion(
+                user_id=current_user.id,
+                text_length=text_length,
+                tokens_used=tokens_needed,
+                voice_used=form.voice.data,
+                filename=filename
+            )
+            db.session.add(conversion)
+
+            # Запись транзакции
+            transaction = TokenTransaction(
+                user_id=current_user.id,
+                amount=-tokens_needed,
+                transaction_type='use',
+                note=f'Конвертация текста ({text_length} символов)'
+            )
+            db.session.add(transaction)
+            db.session.commit()
+
+            response = send_audio_variant(filepath, form.output_format.data)
+            saved = int(response.headers['X-Bytes-Saved'])
+            message = f'Аудио создано! Использовано {tokens_needed} токенов. Осталось: {current_user.tokens}'
+            if saved > 0:
+                original_size = int(response.headers['X-Original-Size'])
+                message += f'. Размер файла уменьшен на {saved // 1024} КБ ({saved * 100 // original_size}%)'
+            flash(message, 'success')
+            return response
+
+        except Exception as e:
+            flash(f'Ошибка при создании аудио: {str(e)}', 'danger')
+
+    # История конвертаций
+    conversions = current_user.conversions.order_by(Conversion.created_at.desc()).limit(10).all()
+
+    return render_template('dashboard.html', form=form, user=current_user, conversions=conversions)
+
+
+@bp.route('/history/<int:conversion_id>/download')
+@login_required
+def download_conversion(conversion_id):
+    """Повторное скачивание файла из истории конвертаций"""
+    conversion = db.session.get(Conversion, conversion_id)
+    if conversion is None or (conversion.user_id != current_user.id and not current_user.is_admin):
+        abort(404)
+    if not conversion.filename:
+        abort(404)
+
+    filepath = get_storage().path('audio', conversion.filename)
+    if not os.path.isfile(filepath):
+        flash('Файл больше недоступен', 'warning')
+        return redirect(url_for('tts.dashboard'))
+
+    output_format = request.args.get('format', 'mp3')
+    if output_format not in OUTPUT_FORMATS:
+        abort(404)
+    if output_format == 'mp3':
+        return send_stored_file(filepath, conversion.filename)
+    return send_audio_variant(filepath, output_format)
+
+
+def parse_batch_items(data, max_items, max_length):
+    """
+    Проверка пакета [{text, voice}, ...] и объединение одинаковых фрагментов
+
+    Returns:
+        list: уникальные фрагменты {text, voice, indexes} в порядке первого появления
+
+    Raises:
+        ValueError: описание первой ошибки
+    """
+    if not isinstance(data, list) or not data:
+        raise ValueError('Ожидается непустой JSON-массив объектов {text, voice}')
+    if len(data) > max_items:
+        raise ValueError(f'Слишком много фрагментов: {len(data)}, максимум {max_items}')
+
+    voices = {voice for voice, _ in VOICES}
+    unique = {}
+    for index, item in enumerate(data):
+        if not isinstance(item, dict) or not isinstance(item.get('text'), str):
+            raise ValueError(f'Фрагмент {index}: нужен объект с полем text')
+        text = clean_text_for_tts(item['text'])
+        voice = item.get('voice')
+        if not text:
+            raise ValueError(f'Фрагмент {index}: пустой текст')
+        if len(text) > max_length:
+            raise ValueError(f'Фрагмент {index}: максимум {max_length} символов')
+        if voice not in voices:
+            raise ValueError(f'Фрагмент {index}: неизвестный голос {voice!r}')
+        entry = unique.setdefault((text, voice), {'text': text, 'voice': voice, 'indexes': []})
+        entry['indexes'].append(index)
+    return list(unique.values())
+
+
+def _change_tokens(user_id, amount, transaction_type, note):
+    """
+    Атомарное изменение баланса одним условным UPDATE вместе с записью в журнал
+
+    Списание (amount < 0) не проходит, если токенов не хватает.
+    """
+    condition = [User.id == user_id]
+    if amount < 0:
+        condition.append(User.tokens >= -amount)
+    changed = db.session.execute(update(User).where(*condition).values(tokens=User.tokens + amount)).rowcount
+    if not changed:
+        db.session.rollback()
+        return False
+    db.session.add(TokenTransaction(user_id=user_id, amount=amount, transaction_type=transaction_type, note=note))
+    db.session.commit()
+    return True
+
+
+async def synthesize_batch(items, workdir, concurrency, results):
+    """Синтез фрагментов не более чем concurrency параллельно; готовые кладутся в очередь results"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def synthesize(number, item):
+        path = os.path.join(workdir, f'{number:04d}.mp3')
+        async with semaphore:
+            try:
+                await generate_audio(item['text'], item['voice'], path)
+            except Exception as e:
+                results.put((number, None, str(e)))
+            else:
+                results.put((number, path, None))
+
+    await asyncio.gather(*(synthesize(number, item) for number, item in enumerate(items)))
+
+
+class _ZipStream(io.RawIOBase):
+    """Приемник для ZipFile без seek: накопленные байты забираются после каждой записи"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _BatchSettlement:
+    """
+    Расчет по пакету: возврат токенов за фрагменты, не попавшие в архив
+
+    Выполняется один раз - из генератора архива или при закрытии ответа, если
+    клиент отключился до первого фрагмента и генератор так и не запустился.
+    """
+
+    def __init__(self, app, user_id, items, costs):
+        self.app = app
+        self.user_id = user_id
+        self.items = items
+        self.costs = costs
+        self.files = {}
+        self.refunded = None
+        self._lock = threading.Lock()
+
+    def settle(self) -> int:
+        """Вернуть токены за несозданные фрагменты; возвращает их количество"""
+        with self._lock:
+            if self.refunded is not None:
+                return self.refunded
+            amount = sum(cost for number, cost in enumerate(self.costs) if number not in self.files)
+            TOKENS_DEBITED.inc(sum(self.costs) - amount, feature='tts')
+            if amount:
+                with self.app.app_context():
+                    _change_tokens(self.user_id, amount, 'refund',
+                                   f'Пакетная озвучка: {len(self.items) - len(self.files)} фрагментов не создано')
+            self.refunded = amount
+            return amount
+
+
+def iter_batch_zip(items, costs, settlement, total_items):
+    """
+    ZIP с аудио, отдаваемый по мере готовности фрагментов
+
+    Последним идет manifest.json: какой файл соответствует каждому фрагменту запроса.
+    Токены за несинтезированные фрагменты возвращаются одной транзакцией.
+    """
+    runner = get_runner()
+    workdir = tempfile.mkdtemp(prefix='tts_batch_')
+    results = queue.Queue()
+    future = runner.submit(synthesize_batch(items, workdir, current_app.config['TTS_BATCH_CONCURRENCY'], results))
+    stream = _ZipStream()
+    files, errors = settlement.files, {}
+
+    try:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for _ in items:
+                try:
+                    number, path, error = results.get(timeout=runner.timeout)
+                except queue.Empty:
+                    break
+                if error:
+                    errors[number] = error
+                else:
+                    files[number] = f'{number + 1:04d}.mp3'
+                    archive.write(path, files[number])
+                    os.remove(path)
+                yield stream.pop()
+
+            refunded_tokens = settlement.settle()
+            manifest = {
+                'items': [
+                    {'index': index, 'file': files.get(number), 'error': errors.get(number)}
+                    for number, item in enumerate(items) for index in item['indexes']
+                ],
+                'total': total_items,
+                'unique': len(items),
+                'tokens_used': sum(costs) - refunded_tokens,
+                'tokens_refunded': refunded_tokens,
+            }
+            manifest['items'].sort(key=lambda entry: entry['index'])
+            archive.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        yield stream.pop()
+    finally:
+        future.cancel()
+        shutil.rmtree(workdir, ignore_errors=True)
+        # Клиент отключился раньше: возвращаем токены за то, что не успели отдать
+        settlement.settle()
+
+
+@bp.route('/api/tts/batch', methods=['POST'])
+def batch():
+    """
+    Пакетная озвучка: JSON-массив [{text, voice}, ...] -> ZIP с MP3
+
+    Вход по сессии или Authorization: Basic. Одинаковые фрагменты озвучиваются
+    один раз, токены за весь пакет списываются одной транзакцией до начала синтеза.
+    """
+    if not current_user.is_authenticated:
+        return jsonify(error='Требуется вход (сессия или Authorization: Basic)'), 401
+    if not current_app.config.get('ENABLE_TTS', True):
+        return jsonify(error='Функция TTS отключена'), 404
+
+    try:
+        items = parse_batch_items(request.get_json(silent=True), current_app.config['TTS_BATCH_MAX_ITEMS'],
+                                  current_app.config['MAX_TEXT_LENGTH'])
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    total_items = sum(len(item['indexes']) for item in items)
+    costs = [calculate_tokens_needed(len(item['text'])) for item in items]
+    tokens_needed = sum(costs)
+
+    release_slot, rejected = acquire_slot('tts')
+    if rejected is not None:
+        return rejected
+
+    characters = sum(len(item['text']) for item in items)
+    if not _change_tokens(current_user.id, -tokens_needed, 'use',
+                          f'Пакетная озвучка ({len(items)} фрагментов, {characters} символов)'):
+        release_slot()
+        return jsonify(error=f'Недостаточно токенов! Нужно: {tokens_needed}, у вас: {current_user.tokens}'), 402
+
+    settlement = _BatchSettlement(current_app._get_current_object(), current_user.id, items, costs)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    response = Response(
+        stream_with_context(iter_batch_zip(items, costs, settlement, total_items)),
+        mimetype='application/zip',
+    )
+    # Если клиент отключился до первого фрагмента, генератор не запускается и
+    # его finally не выполняется: возврат токенов делается при закрытии ответа
+    response.call_on_close(settlement.settle)
+    # Слот занят, пока архив не отдан полностью
+    response.call_on_close(release_slot)
+    response.headers['Content-Disposition'] = f'attachment; filename=tts_batch_{timestamp}.zip'
+    response.headers['X-Batch-Items'] = str(total_items)
+    response.headers['X-Batch-Unique'] = str(len(items))
+    response.headers['X-Tokens-Debited'] = str(tokens_needed)
+    return response
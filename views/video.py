@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from models import db, TokenTransaction
+from forms import VideoDownloadForm
+from admission import limit_concurrency
+from metrics import TOKENS_DEBITED
+from helpers import send_stored_file
+from async_runner import get_runner
+from storage import get_storage
+from jobs import job_handler, run_job
+from video_downloader import VideoDownloader, get_downloader
+
+bp = Blueprint('video', __name__)
+
+
+@job_handler('video')
+def download_job(payload):
+    """Задача скачивания: видео переносится в хранилище"""
+    filepath, title = get_runner().run(get_downloader().download_video(payload['url'], payload['platform']))
+    return {'filename': get_storage().import_file(filepath, 'video'), 'title': title}
+
+
+@bp.route('/video', methods=['GET', 'POST'])
+@login_required
+@limit_concurrency('video')
+def index():
+    """Раздел скачивания видео"""
+    if not current_app.config.get('ENABLE_VIDEO_DOWNLOAD', True):
+        flash('Функция скачивания видео отключена', 'warning')
+        return redirect(url_for('main.index'))
+    
+    form = VideoDownloadForm()
+
+    if form.validate_on_submit():
+        url = form.url.data.strip()
+        tokens_needed = 1
+
+        if current_user.tokens < tokens_needed:
+            flash(
+                f'Недостаточно токенов! Нужно: {tokens_needed}, у вас: {current_user.tokens}',
+                'warning',
+            )
+            return render_template('video.html', form=form, user=current_user)
+
+        # yt_dlp загружается при первом скачивании, определение платформы его не требует
+        platform = VideoDownloader.detect_platform(url)
+        if not platform and current_app.config.get('VIDEO_ALLOW_GENERIC_URLS'):
+            platform = 'Generic'
+        if not platform:
+            flash('Не удалось определить платформу. Поддерживаются YouTube, TikTok и Reels.', 'danger')
+            return render_template('video.html', form=form, user=current_user)
+
+        try:
+            result = run_job('video', {'url': url, 'platform': platform}, user_id=current_user.id)
+            filepath, title = get_storage().path('video', result['filename']), result['title']
+
+            current_user.use_tokens(tokens_needed)
+            TOKENS_DEBITED.inc(tokens_needed, feature='video')
+
+            transaction = TokenTransaction(
+                user_id=current_user.id,
+                amount=-tokens_needed,
+                transaction_type='use',
+                note=f'Скачивание видео ({platform})',
+            )
+            db.session.add(transaction)
+            db.session.commit()
+
+            filename = os.path.basename(filepath)
+            download_name = f'{title}.mp4' if not filename.lower().endswith('.mp4') else filename
+
+            return send_stored_file(filepath, download_name)
+        except Exception as e:
+            flash(f'Ошибка скачивания: {str(e)}', 'danger')
+
+    return render_template('video.html', form=form, user=current_user)